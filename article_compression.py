@@ -0,0 +1,169 @@
+import os
+import random
+import sqlite3
+import struct
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+# Compressed bodies start with a magic marker and the id of the dictionary
+# they were compressed with (0 = no dictionary). Rows written before
+# compression was introduced are plain TEXT and are returned unchanged.
+MAGIC = b"ZD"
+HEADER = struct.Struct(">2sI")
+MAX_DICTIONARY_SIZE = 32768  # zlib only uses the last 32 KiB of a dictionary
+
+
+def compress(text, dictionary=None, dict_id=0, level=6):
+    """Compress `text` with an optional preset dictionary"""
+    if dictionary:
+        compressor = zlib.compressobj(level, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level)
+        dict_id = 0
+    data = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return HEADER.pack(MAGIC, dict_id) + data
+
+
+def is_compressed(value):
+    return isinstance(value, bytes) and value[: len(MAGIC)] == MAGIC
+
+
+def dictionary_id(value):
+    return HEADER.unpack_from(value)[1]
+
+
+def decompress(value, dictionaries):
+    """Decompress a stored body; plain text values are passed through.
+
+    `dictionaries` maps dictionary ids to dictionary bytes.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if not is_compressed(value):
+        return bytes(value).decode("utf-8")
+
+    _, dict_id = HEADER.unpack_from(value)
+    if dict_id:
+        decompressor = zlib.decompressobj(zdict=dictionaries[dict_id])
+    else:
+        decompressor = zlib.decompressobj()
+    data = decompressor.decompress(value[HEADER.size :]) + decompressor.flush()
+    return data.decode("utf-8")
+
+
+def train_dictionary(texts, size=MAX_DICTIONARY_SIZE, max_phrase_words=6):
+    """Build a zlib preset dictionary from sample article bodies.
+
+    Collects word phrases that recur across articles and packs the most
+    valuable ones (frequency times length) into `size` bytes. The most
+    common phrases go last, since zlib finds matches closer to the end of
+    the dictionary more cheaply.
+    """
+    counts = Counter()
+    for text in texts:
+        words = text.split()
+        seen = set()
+        for n in range(2, max_phrase_words + 1):
+            for i in range(len(words) - n + 1):
+                phrase = " ".join(words[i : i + n])
+                if phrase not in seen:
+                    seen.add(phrase)
+                    counts[phrase] += 1
+
+    candidates = [
+        (count * len(phrase), phrase) for phrase, count in counts.items() if count > 1
+    ]
+    candidates.sort(reverse=True)
+
+    selected = []
+    total = 0
+    for _, phrase in candidates:
+        encoded = (phrase + " ").encode("utf-8")
+        if total + len(encoded) > size:
+            continue
+        if any(phrase in other for other in selected[-50:]):
+            continue
+        selected.append(phrase)
+        total += len(encoded)
+
+    return " ".join(reversed(selected)).encode("utf-8")[:size]
+
+
+def benchmark(texts, level=6, read_samples=200):
+    """Compare plain and compressed storage of `texts`.
+
+    Writes the bodies into two temporary databases and reports the file
+    size, insert throughput and per-row read latency of each.
+    """
+    sample = texts[: max(1, len(texts) // 5)]
+    dictionary = train_dictionary(sample)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("plain", "compressed"):
+            path = os.path.join(tmp, f"{mode}.db")
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, content TEXT)")
+
+            start = time.perf_counter()
+            if mode == "plain":
+                rows = [(text,) for text in texts]
+            else:
+                rows = [(compress(text, dictionary, 1, level),) for text in texts]
+            with conn:
+                conn.executemany("INSERT INTO articles (content) VALUES (?)", rows)
+            insert_seconds = time.perf_counter() - start
+            conn.execute("VACUUM")
+
+            ids = [random.randint(1, len(texts)) for _ in range(read_samples)]
+            start = time.perf_counter()
+            for article_id in ids:
+                value = conn.execute(
+                    "SELECT content FROM articles WHERE id = ?", (article_id,)
+                ).fetchone()[0]
+                decompress(value, {1: dictionary})
+            read_seconds = time.perf_counter() - start
+            conn.close()
+
+            results[mode] = {
+                "db_bytes": os.path.getsize(path),
+                "inserts_per_second": len(texts) / insert_seconds,
+                "read_ms": read_seconds / len(ids) * 1000,
+            }
+
+    print(f"\n=== Article Compression Benchmark ({len(texts)} articles) ===")
+    for mode, stats in results.items():
+        print(
+            f"{mode:>10}: {stats['db_bytes'] / 1024:,.0f} KiB, "
+            f"{stats['inserts_per_second']:,.0f} inserts/s, "
+            f"{stats['read_ms']:.3f} ms/read"
+        )
+    ratio = results["plain"]["db_bytes"] / results["compressed"]["db_bytes"]
+    print(f"Size reduction: {ratio:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import storage
+
+    parser = argparse.ArgumentParser(description="Article body compression")
+    parser.add_argument(
+        "command",
+        choices=["recompress", "benchmark"],
+        help="recompress: train a new dictionary and rewrite all stored bodies; "
+        "benchmark: compare plain and compressed storage of the stored bodies",
+    )
+    args = parser.parse_args()
+
+    if args.command == "recompress":
+        storage.recompress_articles()
+    else:
+        texts = storage.get_all_article_bodies()
+        if not texts:
+            print("No articles stored")
+        else:
+            benchmark(texts)
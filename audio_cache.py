@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import config_parser
+
+
+class AudioCache:
+    """Directory of generated line audio, addressed by the request content.
+
+    The key covers model, voice, format and the rendered prompt (line text,
+    voice expression and history), so only identical requests share audio.
+    Files are stored as `<key>.<format>`; beyond `max_bytes` the least
+    recently used ones (by modification time, refreshed on every hit) are
+    deleted.
+    """
+
+    def __init__(
+        self, directory=os.path.join("data", "audio_cache"), max_bytes=2_000_000_000
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def make_key(model, voice, audio_format, messages):
+        payload = json.dumps(
+            {
+                "model": model,
+                "voice": voice,
+                "format": audio_format,
+                "messages": messages,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key, audio_format):
+        return os.path.join(self.directory, f"{key}.{audio_format}")
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            # Temporary files are still being written by put
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def read(self, key, audio_format):
+        """Return the cached audio bytes, or None if not cached"""
+        path = self._path(key, audio_format)
+        # put replaces files atomically, so reading needs no lock; only the
+        # counters and the access time used for eviction do
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted after it was read; the data is still valid
+                pass
+        return data
+
+    def fetch(self, key, audio_format, destination):
+        """Place the cached audio at `destination`; False if not cached"""
+        path = self._path(key, audio_format)
+        # Replace rather than overwrite, so the cached file is never modified
+        # through a hard link
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(path, destination)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            shutil.copyfile(path, destination)
+        return True
+
+    def put(self, key, audio_format, data):
+        path = self._path(key, audio_format)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._size <= self.max_bytes:
+                break
+            os.remove(path)
+            self._size -= size
+
+    def report(self):
+        if self.hits + self.misses == 0:
+            return
+        print("\n=== Audio Cache ===")
+        print(
+            f"podcast_audio: {self.hits} hits, {self.misses} misses "
+            f"({self.hits / (self.hits + self.misses):.0%} hit rate)"
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_enabled = None
+
+
+def set_audio_cache_enabled(enabled):
+    """Force the audio cache on or off for this process"""
+    global _enabled
+    _enabled = enabled
+
+
+def get_audio_cache(config):
+    """Return the process-wide audio cache, or None when it is disabled"""
+    global _cache
+    settings = config_parser.get_audio_cache(config)
+    enabled = settings.get("enabled", True) if _enabled is None else _enabled
+    if not enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache(
+                directory=settings.get(
+                    "directory", os.path.join("data", "audio_cache")
+                ),
+                max_bytes=settings.get("max_bytes", 2_000_000_000),
+            )
+    return _cache
+
+
+def report_audio_cache_stats():
+    if _cache is not None:
+        _cache.report()
@@ -0,0 +1,281 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from config_parser import get_batch
+from llm_cache import CompletionCache, create_completion, get_cache
+from rate_limiter import estimate_tokens
+from telemetry import estimate_cost
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def make_request(custom_id, model, messages, temperature=None, max_tokens=None):
+    """One line of a batch input file in the OpenAI Batch format"""
+    body = {"model": model, "messages": messages}
+    if temperature is not None:
+        body["temperature"] = temperature
+    if max_tokens is not None:
+        body["max_tokens"] = max_tokens
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body,
+    }
+
+
+def write_batch_file(requests, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(text):
+    """Map custom_id to the completion text of every successful result"""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            print(f"Batch request {result.get('custom_id')} failed: {result}")
+            continue
+        body = response["body"]
+        results[result["custom_id"]] = body["choices"][0]["message"]["content"]
+    return results
+
+
+class OpenAIBatchBackend:
+    """Submits batch files to the OpenAI Batch API."""
+
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, path):
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id):
+        """Return the batch status and, once it has ended, its result lines.
+
+        Failed requests are listed in a separate error file in the same
+        format; its lines are appended so that failures are reported too.
+        An expired or cancelled batch still returns what was completed.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in TERMINAL_STATUSES:
+            return batch.status, None
+        parts = [
+            self.client.files.content(file_id).text
+            for file_id in (batch.output_file_id, batch.error_file_id)
+            if file_id
+        ]
+        return batch.status, "\n".join(parts) if parts else None
+
+
+def stub_response(body):
+    """Offline stand-in for a chat completion: echoes the start of the prompt"""
+    text = body["messages"][-1]["content"]
+    return f"[{body['model']}] {' '.join(text.split()[:50])}"
+
+
+class LocalBatchBackend:
+    """File-based stand-in for the Batch API, for running the flow offline.
+
+    Every submitted file is copied into its own directory under `directory`.
+    The first poll answers each request with `responder(body)` and writes
+    the results in the Batch output format.
+    """
+
+    def __init__(self, directory=os.path.join("data", "batches"), responder=None):
+        self.directory = directory
+        self.responder = responder or stub_response
+
+    def submit(self, path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        batch_dir = os.path.join(self.directory, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+        shutil.copy(path, os.path.join(batch_dir, "input.jsonl"))
+        return batch_id
+
+    def poll(self, batch_id):
+        batch_dir = os.path.join(self.directory, batch_id)
+        output_path = os.path.join(batch_dir, "output.jsonl")
+        if not os.path.exists(output_path):
+            self._process(batch_dir, output_path)
+        with open(output_path, "r", encoding="utf-8") as f:
+            return "completed", f.read()
+
+    def _process(self, batch_dir, output_path):
+        with open(os.path.join(batch_dir, "input.jsonl"), "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        with open(output_path, "w", encoding="utf-8") as f:
+            for request in requests:
+                body = request["body"]
+                completion = {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": self.responder(body),
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                }
+                result = {
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": completion},
+                    "error": None,
+                }
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def get_backend(config):
+    """Create the batch backend selected by `batch.backend` in the config"""
+    settings = get_batch(config)
+    directory = settings.get("directory", os.path.join("data", "batches"))
+    if settings.get("backend", "openai") == "local":
+        return LocalBatchBackend(directory)
+
+    from openai_client import get_client
+
+    return OpenAIBatchBackend(
+        get_client(config), settings.get("completion_window", "24h")
+    )
+
+
+def run_batch(
+    stage, config, requests: List[dict], backend=None, poll_interval=None
+) -> List[Optional[str]]:
+    """Run chat completions through a batch and return the texts in order.
+
+    Each item of `requests` holds the keyword arguments of a completion
+    (model, messages, temperature, max_tokens). Cached results are reused
+    and only the rest is submitted; new results are added to the cache.
+    Requests the batch has no result for are reported and come back as
+    None. With `batch.live_fallback`, up to `batch.live_fallback_max` of
+    them are sent as live requests at full price instead.
+    """
+    settings = get_batch(config)
+    backend = backend or get_backend(config)
+    poll_interval = poll_interval or settings.get("poll_interval", 30)
+    cache = get_cache(config)
+
+    results: List[Optional[str]] = [None] * len(requests)
+    keys = [None] * len(requests)
+    pending = []
+    for i, params in enumerate(requests):
+        if cache is not None:
+            keys[i] = CompletionCache.make_key(
+                params["model"],
+                params["messages"],
+                params.get("temperature"),
+                params.get("max_tokens"),
+            )
+            results[i] = cache.get(keys[i], stage)
+        if results[i] is None:
+            pending.append(make_request(f"{stage}-{i}", **params))
+
+    print(f"{stage}: {len(requests) - len(pending)} cached, {len(pending)} to batch")
+    if not pending:
+        return results
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = write_batch_file(
+        pending,
+        os.path.join(
+            settings.get("directory", os.path.join("data", "batches")),
+            f"{stage}_{timestamp}.jsonl",
+        ),
+    )
+    batch_id = backend.submit(path)
+    print(f"Submitted batch {batch_id} with {len(pending)} requests")
+
+    while True:
+        status, output = backend.poll(batch_id)
+        if status in TERMINAL_STATUSES:
+            break
+        print(f"Batch {batch_id}: {status}")
+        time.sleep(poll_interval)
+
+    if status != "completed":
+        print(f"Batch {batch_id} ended with status {status}")
+
+    for custom_id, content in parse_batch_output(output or "").items():
+        i = int(custom_id.rsplit("-", 1)[1])
+        results[i] = content
+        if cache is not None and content is not None:
+            cache.put(keys[i], stage, requests[i]["model"], content)
+
+    missing = [
+        i
+        for i in (int(request["custom_id"].rsplit("-", 1)[1]) for request in pending)
+        if results[i] is None
+    ]
+    if not missing:
+        print(f"Batch {batch_id} completed")
+        return results
+
+    print(
+        f"Batch {batch_id}: no result for {len(missing)} of {len(pending)} "
+        f"requests ({', '.join(f'{stage}-{i}' for i in missing)})"
+    )
+    # Only a few stragglers are worth paying the live price for; a batch
+    # that failed as a whole is better resubmitted
+    limit = settings.get("live_fallback_max", 0)
+    if settings.get("live_fallback", False) and len(missing) <= limit:
+        run_live(stage, config, requests, missing, results)
+    elif settings.get("live_fallback", False):
+        print(
+            f"Not sending {len(missing)} requests live (batch.live_fallback_max "
+            f"is {limit}); they come back without a result"
+        )
+    return results
+
+
+def run_live(stage, config, requests, indices, results):
+    """Send the requests at `indices` as live completions, filling `results`"""
+    from openai_client import get_client
+
+    cost = 0.0
+    for i in indices:
+        params = requests[i]
+        prompt = estimate_tokens(params["model"], params["messages"])
+        cost += (
+            estimate_cost(
+                config, params["model"], prompt, params.get("max_tokens") or 0
+            )
+            or 0.0
+        )
+    print(
+        f"Sending {len(indices)} {stage} requests live, "
+        f"up to ${cost:.4f} at full price"
+    )
+
+    client = get_client(config, stage)
+    for i in indices:
+        try:
+            results[i] = create_completion(client, stage, config, **requests[i])
+        except Exception as e:
+            print(f"Live request {stage}-{i} failed: {e}")
@@ -0,0 +1,249 @@
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from config_parser import (
+    get_models,
+    format_distillation_prompt,
+    format_distillation_merge_prompt,
+    require_keys,
+)
+
+# Paragraphs are separated by blank lines; sentences end with . ! or ?
+# followed by whitespace.
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Tokens added by the chat format around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """Return a function counting the tokens of a text for `model`.
+
+    Uses tiktoken when it is installed and its encoding can be loaded;
+    otherwise falls back to an estimate of four characters per token.
+    """
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: (len(text) + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping paragraph ends as separate units"""
+    sentences = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            sentences.extend(s for s in _SENTENCE_END.split(paragraph) if s)
+    return sentences
+
+
+def _split_long_sentence(sentence, budget, count_tokens):
+    """Break a sentence that alone exceeds the budget at word boundaries"""
+    pieces = []
+    current = []
+    for word in sentence.split():
+        candidate = " ".join(current + [word])
+        if current and count_tokens(candidate) > budget:
+            pieces.append(" ".join(current))
+            current = [word]
+        else:
+            current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_by_tokens(
+    text: str,
+    budget: int,
+    count_tokens: Callable[[str], int],
+    overlap: int = 0,
+) -> List[str]:
+    """Pack whole sentences into chunks of at most `budget` tokens.
+
+    With `overlap`, each chunk starts with the trailing sentences of the
+    previous chunk, up to `overlap` tokens, to keep context across cuts.
+    """
+    units = []
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence)
+        if tokens > budget:
+            for piece in _split_long_sentence(sentence, budget, count_tokens):
+                units.append((piece, count_tokens(piece)))
+        else:
+            units.append((sentence, tokens))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence, tokens in units:
+        # +1 for the joining space
+        if current and current_tokens + tokens + 1 > budget:
+            chunks.append(" ".join(s for s, _ in current))
+
+            carried = []
+            carried_tokens = 0
+            for prev, prev_tokens in reversed(current):
+                if carried_tokens + prev_tokens > overlap:
+                    break
+                carried.insert(0, (prev, prev_tokens))
+                carried_tokens += prev_tokens + 1
+            if carried_tokens + tokens > budget:
+                carried, carried_tokens = [], 0
+            current, current_tokens = carried, carried_tokens
+
+        current.append((sentence, tokens))
+        current_tokens += tokens + 1
+
+    if current:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
+
+
+def prompt_tokens(
+    config, count_tokens: Callable[[str], int], format_prompt=format_distillation_prompt
+) -> int:
+    """Tokens of the prompt built by `format_prompt` without the text"""
+    messages = format_prompt(config, "")
+    return sum(
+        count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def distillation_budget(config, count_tokens: Callable[[str], int]) -> int:
+    """Token budget for one distillation chunk.
+
+    The model's context window minus the prompt and the reserved output,
+    capped at `max_chunk_tokens` to keep chunks small enough to distill
+    well.
+    """
+    settings = get_models(config)["content_distillation"]
+    available = (
+        settings.get("context_window", 16385)
+        - prompt_tokens(config, count_tokens)
+        - settings["max_tokens"]
+    )
+    max_chunk_tokens = settings.get("max_chunk_tokens")
+    if max_chunk_tokens:
+        available = min(available, max_chunk_tokens)
+    if available <= 0:
+        raise ValueError(
+            "content_distillation leaves no room for text: "
+            "raise context_window or lower max_tokens"
+        )
+    return available
+
+
+def merge_budget(config, count_tokens: Callable[[str], int]) -> int:
+    """Token budget for the partial summaries merged in one request"""
+    require_keys(config, "distillation_merge")
+    settings = get_models(config)["content_distillation"]
+    return (
+        settings.get("context_window", 16385)
+        - prompt_tokens(
+            config,
+            count_tokens,
+            lambda config, text: format_distillation_merge_prompt(config, [text]),
+        )
+        - settings["max_tokens"]
+    )
+
+
+def chunk_text(text: str, config) -> List[str]:
+    """Split text for distillation using the token budget from the config"""
+    settings = get_models(config)["content_distillation"]
+    count_tokens = get_token_counter(settings["model"])
+    budget = distillation_budget(config, count_tokens)
+    return chunk_by_tokens(
+        text, budget, count_tokens, overlap=settings.get("chunk_overlap", 0)
+    )
+
+
+def iter_chunks(texts: Iterable[str], config) -> Iterator[str]:
+    """Chunk a stream of texts (e.g. PDF pages) without holding all of it.
+
+    Only the unfinished tail chunk is carried over to the next text, so
+    memory stays bounded by one chunk plus one page.
+    """
+    settings = get_models(config)["content_distillation"]
+    count_tokens = get_token_counter(settings["model"])
+    budget = distillation_budget(config, count_tokens)
+    overlap = settings.get("chunk_overlap", 0)
+
+    tail = ""
+    for text in texts:
+        chunks = chunk_by_tokens(f"{tail}\n{text}", budget, count_tokens, overlap)
+        if not chunks:
+            continue
+        yield from chunks[:-1]
+        tail = chunks[-1]
+    if tail:
+        yield tail
+
+
+def benchmark(paths: List[str], config) -> Optional[dict]:
+    """Compare the character chunker with the token chunker on sample files.
+
+    Reports the number of calls, total tokens sent (chunk plus prompt),
+    the spread of chunk sizes in tokens and the number of chunks ending
+    mid-sentence.
+    """
+    from distill_content import create_chunks
+
+    settings = get_models(config)["content_distillation"]
+    count_tokens = get_token_counter(settings["model"])
+    overhead = prompt_tokens(config, count_tokens)
+
+    results = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        print(f"\n=== {path} ({count_tokens(text)} tokens) ===")
+        for name, chunks in (
+            ("characters", create_chunks(text, settings["chunk_size"])),
+            ("tokens", chunk_text(text, config)),
+        ):
+            sizes = [count_tokens(chunk) for chunk in chunks] or [0]
+            cut = sum(
+                1 for chunk in chunks if not chunk.rstrip().endswith((".", "!", "?"))
+            )
+            stats = {
+                "calls": len(chunks),
+                "tokens_sent": sum(sizes) + overhead * len(chunks),
+                "min_tokens": min(sizes),
+                "max_tokens": max(sizes),
+                "mid_sentence_cuts": cut,
+            }
+            results[(path, name)] = stats
+            print(
+                f"{name:>10}: {stats['calls']} calls, {stats['tokens_sent']} tokens sent, "
+                f"chunks {stats['min_tokens']}-{stats['max_tokens']} tokens, "
+                f"{stats['mid_sentence_cuts']} mid-sentence cuts"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config_parser import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Compare character and token chunking on sample documents"
+    )
+    parser.add_argument("paths", nargs="+", help="Text files to chunk")
+    args = parser.parse_args()
+
+    benchmark(args.paths, load_config())
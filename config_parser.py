@@ -1,12 +1,222 @@
 import json
 import os
+import string
+import threading
+from typing import Dict, Optional, Set
 
 
-def load_config(config_path=None):
+class ConfigError(ValueError):
+    """Raised when the configuration is missing keys or has broken templates"""
+
+
+class PromptTemplate:
+    """A `str.format` template that is parsed once.
+
+    `partial` fills in fields that do not change between calls (styles,
+    speaker names) ahead of time, so rendering only joins the remaining
+    values into precomputed text.
+    """
+
+    def __init__(self, text: Optional[str] = None, parts: Optional[list] = None):
+        self.parts = parts if parts is not None else self._parse(text)
+
+    @staticmethod
+    def _parse(text):
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if literal:
+                parts.append(literal)
+            if field is not None:
+                if not field.isidentifier():
+                    raise ValueError(f"unsupported placeholder {{{field}}}")
+                parts.append((field, spec or "", conversion))
+        return parts
+
+    @property
+    def fields(self) -> Set[str]:
+        return {part[0] for part in self.parts if isinstance(part, tuple)}
+
+    @staticmethod
+    def _format(part, value):
+        _, spec, conversion = part
+        if conversion == "r":
+            value = repr(value)
+        elif conversion == "a":
+            value = ascii(value)
+        elif conversion == "s":
+            value = str(value)
+        return format(value, spec)
+
+    def partial(self, **values) -> "PromptTemplate":
+        parts = []
+        for part in self.parts:
+            if isinstance(part, tuple) and part[0] in values:
+                part = self._format(part, values[part[0]])
+            if isinstance(part, str) and parts and isinstance(parts[-1], str):
+                parts[-1] += part
+            else:
+                parts.append(part)
+        return PromptTemplate(parts=parts)
+
+    def render(self, **values) -> str:
+        return "".join(
+            part if isinstance(part, str) else self._format(part, values[part[0]])
+            for part in self.parts
+        )
+
+
+# Keys every pipeline run needs, checked when the config is loaded
+REQUIRED_KEYS = {
+    "directories": ["data", "audio", "posts", "scripts", "episodes"],
+    "models.podcast_script": ["model", "temperature", "max_tokens"],
+    "models.podcast_audio": ["model", "modalities", "format"],
+    "models.content_distillation": ["model", "temperature", "max_tokens"],
+    "models.linkedin_post": ["model", "temperature", "max_tokens"],
+    "speakers.1": ["name", "voice", "personality"],
+    "speakers.2": ["name", "voice", "personality"],
+    "podcast_styles": ["intro", "content", "outro"],
+    "prompts.script": ["system", "user"],
+    "prompts.distillation": ["system", "user"],
+    "screenwriter.screenwriter": ["system"],
+}
+
+# Keys only some stages need, checked by those stages with require_keys
+STAGE_KEYS = {
+    "distillation_merge": {"prompts.distillation_merge": ["system", "user"]},
+    "briefing": {"briefing.analyst": ["system"]},
+}
+
+# Placeholders each template may use
+TEMPLATE_FIELDS = {
+    "prompts.script.user": {
+        "intro_style",
+        "content_style",
+        "outro_style",
+        "main_content",
+        "speaker1_name",
+        "speaker2_name",
+    },
+    "screenwriter.screenwriter.system": {"speaker_1", "speaker_2"},
+    "prompts.distillation.user": {"text"},
+    "prompts.distillation_merge.user": {"text"},
+    "prompts.speech_instructions": {"name", "personality", "voice_expression"},
+}
+
+
+def _lookup(config, dotted_key):
+    value = config
+    for key in dotted_key.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _missing_keys(config, required):
+    problems = []
+    for section, keys in required.items():
+        value = _lookup(config, section)
+        if not isinstance(value, dict):
+            problems.append(f"missing section '{section}'")
+            continue
+        problems.extend(
+            f"missing key '{section}.{key}'" for key in keys if key not in value
+        )
+    return problems
+
+
+def require_keys(config, stage):
+    """Fail with ConfigError if keys the stage needs (see STAGE_KEYS) are missing"""
+    problems = _missing_keys(config, STAGE_KEYS[stage])
+    if problems:
+        raise ConfigError("Invalid configuration:\n- " + "\n- ".join(problems))
+
+
+def validate_config(config):
+    """Check required keys and template placeholders, reporting all problems"""
+    problems = _missing_keys(config, REQUIRED_KEYS)
+
+    for key, allowed in TEMPLATE_FIELDS.items():
+        text = _lookup(config, key)
+        if text is None:
+            continue
+        try:
+            unknown = PromptTemplate(text).fields - allowed
+        except ValueError as e:
+            problems.append(f"invalid template '{key}': {e}")
+            continue
+        if unknown:
+            problems.append(
+                f"template '{key}' uses unknown placeholders: {', '.join(sorted(unknown))}"
+            )
+
+    if problems:
+        raise ConfigError("Invalid configuration:\n- " + "\n- ".join(problems))
+
+
+def compile_templates(config) -> Dict[str, PromptTemplate]:
+    """Parse the prompt templates and fill in everything but the content"""
+    prompts = get_prompts(config)
+    speakers = get_speakers(config)
+    podcast_styles = get_podcast_styles(config)
+
+    templates = {
+        "script_user": PromptTemplate(prompts["script"]["user"]).partial(
+            intro_style=podcast_styles["intro"],
+            content_style=podcast_styles["content"],
+            outro_style=podcast_styles["outro"],
+            speaker1_name=speakers["1"]["name"],
+            speaker2_name=speakers["2"]["name"],
+        ),
+        "screenwriter_system": PromptTemplate(
+            get_screenwriter(config)["screenwriter"]["system"]
+        ).partial(
+            speaker_1=speakers["1"]["personality"],
+            speaker_2=speakers["2"]["personality"],
+        ),
+        "distillation_user": PromptTemplate(prompts["distillation"]["user"]),
+    }
+    if "distillation_merge" in prompts:
+        templates["distillation_merge_user"] = PromptTemplate(
+            prompts["distillation_merge"]["user"]
+        )
+    if "speech_instructions" in prompts:
+        templates["speech_instructions"] = PromptTemplate(
+            prompts["speech_instructions"]
+        )
+    return templates
+
+
+class Config(dict):
+    """The parsed configuration file.
+
+    A dict, so all `get_*` helpers work on it, that also knows the file and
+    modification time it was loaded from and carries the precompiled prompt
+    templates. Instances are shared between callers; treat them as
+    read-only.
+    """
+
+    def __init__(self, data: dict, path: Optional[str] = None, mtime: int = 0):
+        super().__init__(data)
+        self.path = path
+        self.mtime = mtime
+        self.templates: Dict[str, PromptTemplate] = compile_templates(self)
+
+
+_configs: Dict[str, Config] = {}
+_configs_lock = threading.Lock()
+
+
+def load_config(config_path=None, validate=True):
     """
     Load the configuration from a JSON file.
     Args:
         config_path: Path to config file. If None, uses default "based_config.json"
+        validate: Fail with ConfigError on missing keys or broken templates
+
+    The parsed config is memoized by path and modification time: repeated
+    calls return the same object until the file changes, so a long-running
+    worker picks up edits by calling load_config (or reload_config) again.
     """
     # Use default path if none provided
     config_path = config_path or "based_config.json"
@@ -18,15 +228,55 @@ def load_config(config_path=None):
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Configuration file {config_path} not found.")
 
+    mtime = os.stat(config_path).st_mtime_ns
+    with _configs_lock:
+        cached = _configs.get(config_path)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+
     try:
         with open(config_path, "r") as f:
-            config = json.load(f)
-        return config
+            data = json.load(f)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in config file: {str(e)}")
     except Exception as e:
         raise Exception(f"Error loading config: {str(e)}")
 
+    if validate:
+        validate_config(data)
+    try:
+        config = Config(data, config_path, mtime)
+    except (KeyError, ValueError) as e:
+        raise ConfigError(f"Invalid configuration: {e}")
+
+    with _configs_lock:
+        _configs[config_path] = config
+    return config
+
+
+def reload_config(config):
+    """Return the latest version of `config` for hot reloading.
+
+    If the file changed and the new version is valid it is returned;
+    otherwise the current config is kept and the problem is printed.
+    """
+    path = getattr(config, "path", None)
+    if path is None:
+        return config
+    try:
+        return load_config(path)
+    except (OSError, ValueError) as e:
+        print(f"Keeping current config, reload failed: {e}")
+        return config
+
+
+def _templates(config):
+    templates = getattr(config, "templates", None)
+    if templates is None:
+        # A plain dict, e.g. built in code; compile on the fly
+        templates = compile_templates(config)
+    return templates
+
 
 def get_directories(config):
     return config.get("directories", {})
@@ -56,6 +306,38 @@ def get_briefing(config):
     return config.get("briefing", {})
 
 
+def get_scraper(config):
+    return config.get("scraper", {})
+
+
+def get_database(config):
+    return config.get("database", {})
+
+
+def get_llm_cache(config):
+    return config.get("llm_cache", {})
+
+
+def get_openai_client(config):
+    return config.get("openai_client", {})
+
+
+def get_batch(config):
+    return config.get("batch", {})
+
+
+def get_telemetry(config):
+    return config.get("telemetry", {})
+
+
+def get_audio_cache(config):
+    return config.get("audio_cache", {})
+
+
+def get_rate_limits(config):
+    return config.get("rate_limits", {})
+
+
 def get_data_dir(config):
     directories = get_directories(config)
     return directories.get("data", ".")
@@ -63,19 +345,9 @@ def get_data_dir(config):
 
 # Formatting functions for prompts
 def format_script_prompt(config, main_content):
-    prompts = get_prompts(config)
-    podcast_styles = get_podcast_styles(config)
-    speakers = get_speakers(config)
-    script_prompt = prompts["script"]
-
-    user_prompt = script_prompt["user"].format(
-        intro_style=podcast_styles["intro"],
-        content_style=podcast_styles["content"],
-        outro_style=podcast_styles["outro"],
-        main_content=main_content,
-        speaker1_name=speakers["1"]["name"],
-        speaker2_name=speakers["2"]["name"],
-    )
+    script_prompt = get_prompts(config)["script"]
+
+    user_prompt = _templates(config)["script_user"].render(main_content=main_content)
 
     return {
         "system": script_prompt["system"],
@@ -84,14 +356,7 @@ def format_script_prompt(config, main_content):
 
 
 def format_screenwriter_prompt(config, raw_script):
-    screenwriter = get_screenwriter(config)
-    speakers = get_speakers(config)
-    screenwriter_prompt = screenwriter["screenwriter"]
-
-    system_prompt = screenwriter_prompt["system"].format(
-        speaker_1=speakers["1"]["personality"],
-        speaker_2=speakers["2"]["personality"],
-    )
+    system_prompt = _templates(config)["screenwriter_system"].render()
 
     user_prompt = f"Here is the podcast transcript:\n\n{raw_script}"
 
@@ -122,12 +387,30 @@ def format_linkedin_post_prompt(config, article_content):
 
 
 def format_distillation_prompt(config, chunk):
-    models = get_models(config)
     prompts = get_prompts(config)
 
     messages = [
         {"role": "system", "content": prompts["distillation"]["system"]},
-        {"role": "user", "content": prompts["distillation"]["user"].format(text=chunk)},
+        {
+            "role": "user",
+            "content": _templates(config)["distillation_user"].render(text=chunk),
+        },
+    ]
+
+    return messages
+
+
+def format_distillation_merge_prompt(config, summaries):
+    prompts = get_prompts(config)
+
+    messages = [
+        {"role": "system", "content": prompts["distillation_merge"]["system"]},
+        {
+            "role": "user",
+            "content": _templates(config)["distillation_merge_user"].render(
+                text="\n\n---\n\n".join(summaries)
+            ),
+        },
     ]
 
     return messages
@@ -160,4 +443,12 @@ def format_audio_generation_prompt(
     return messages
 
 
+def format_speech_instructions(config, speaker_info, voice_expression):
+    return _templates(config)["speech_instructions"].render(
+        name=speaker_info["name"],
+        personality=speaker_info["personality"],
+        voice_expression=voice_expression,
+    )
+
+
 # Add any other helper functions as needed
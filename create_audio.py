@@ -1,17 +1,35 @@
+import ast
 import base64
-from openai import OpenAI
-from dotenv import load_dotenv
+import hashlib
+import math
+import random
+import io
+import wave
 import os
-from collections import deque
+import sys
+import threading
+import time
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+from pydub import AudioSegment
 from utils import get_latest_file
+from audio_cache import AudioCache, get_audio_cache
+from run_manifest import RunManifest, manifest_path
+from openai_client import get_client
+from rate_limiter import RETRYABLE_ERRORS, scheduled_call
+from telemetry import record_call
 
 from config_parser import (
+    ConfigError,
     load_config,
+    get_prompts,
     get_models,
     get_speakers,
     get_directories,
     format_audio_generation_prompt,
+    format_speech_instructions,
 )
 
 
@@ -20,6 +38,20 @@ def read_podcast_script(filepath):
         return f.read()
 
 
+def parse_line(speaker_tuple):
+    """Turn a ("Speaker X", "text", "expression") tuple into a line dict"""
+    if len(speaker_tuple) < 3:  # ("Speaker X", "text", "expression")
+        return None
+    speaker, text, voice_expression = speaker_tuple[:3]
+    # Extract speaker number from "Speaker X"
+    speaker_num = speaker.split()[1]
+    return {
+        "speaker": speaker_num,
+        "text": text.strip(),
+        "voice_expression": voice_expression.strip(),
+    }
+
+
 def parse_script(content):
     """Parse the screenplay format script"""
     try:
@@ -28,17 +60,9 @@ def parse_script(content):
         parsed_lines = []
 
         for speaker_tuple in script_data:
-            if len(speaker_tuple) >= 3:  # ("Speaker X", "text", "expression")
-                speaker, text, voice_expression = speaker_tuple[:3]
-                # Extract speaker number from "Speaker X"
-                speaker_num = speaker.split()[1]
-                parsed_lines.append(
-                    {
-                        "speaker": speaker_num,
-                        "text": text.strip(),
-                        "voice_expression": voice_expression.strip(),
-                    }
-                )
+            line = parse_line(speaker_tuple)
+            if line:
+                parsed_lines.append(line)
 
         return parsed_lines
     except Exception as e:
@@ -46,6 +70,307 @@ def parse_script(content):
         return []
 
 
+class ScriptLineParser:
+    """Incremental parser for screenplay output arriving in pieces.
+
+    `feed` takes the next piece of text and returns the lines whose tuple
+    was completed by it, so audio generation can start on the first line
+    while the rest of the script is still being written. Text outside of
+    tuples (list brackets, code fences, commas) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.start = None
+        self.quote = None
+        self.escaped = False
+
+    def feed(self, text):
+        self.buffer += text
+        lines = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.quote:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == self.quote:
+                    self.quote = None
+            elif self.depth and char in "'\"":
+                self.quote = char
+            elif char == "(":
+                if self.depth == 0:
+                    self.start = self.pos
+                self.depth += 1
+            elif char == ")" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    line = self._parse(self.buffer[self.start : self.pos + 1])
+                    if line:
+                        lines.append(line)
+                    # Drop the consumed text to keep the buffer small
+                    self.buffer = self.buffer[self.pos + 1 :]
+                    self.pos = -1
+                    self.start = None
+            self.pos += 1
+        if self.start is None:
+            self.buffer, self.pos = "", 0
+        return lines
+
+    @staticmethod
+    def _parse(literal):
+        try:
+            value = ast.literal_eval(literal)
+            if isinstance(value, tuple):
+                return parse_line(value)
+        except (ValueError, SyntaxError, IndexError, AttributeError) as e:
+            print(f"Skipping unparsable script line: {e}")
+        return None
+
+
+class AudioClip(namedtuple("AudioClip", "pcm channels sample_width frame_rate file")):
+    """Decoded audio of one line: raw PCM frames plus their format.
+
+    `file` is the part file the line was also written to, or None.
+    """
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (self.channels * self.sample_width * self.frame_rate)
+
+
+def decode_audio(data, audio_format="wav", file=None):
+    """Decode audio bytes into an AudioClip, once per line"""
+    if audio_format == "wav":
+        with wave.open(io.BytesIO(data)) as wav:
+            return AudioClip(
+                memoryview(wav.readframes(wav.getnframes())),
+                wav.getnchannels(),
+                wav.getsampwidth(),
+                wav.getframerate(),
+                file,
+            )
+    segment = AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+    return AudioClip(
+        memoryview(segment.raw_data),
+        segment.channels,
+        segment.sample_width,
+        segment.frame_rate,
+        file,
+    )
+
+
+def encode_wav(clip):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(clip.channels)
+        wav.setsampwidth(clip.sample_width)
+        wav.setframerate(clip.frame_rate)
+        wav.writeframes(clip.pcm)
+    return buffer.getvalue()
+
+
+def read_clip(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    return decode_audio(data, os.path.splitext(filename)[1][1:], file=filename)
+
+
+class ChatAudioEngine:
+    """Audio-capable chat model; the whole clip arrives base64 in one response"""
+
+    def __init__(self, client, settings):
+        self.client = client
+        self.model = settings["model"]
+        self.audio_format = settings["format"]
+        self.modalities = settings["modalities"]
+
+    def prompt(self, config, speaker_info, voice_expression, history, text):
+        return format_audio_generation_prompt(
+            config, speaker_info, voice_expression, history, text
+        )
+
+    def synthesize(self, config, voice, messages, filename):
+        raw, retries = scheduled_call(
+            config,
+            "podcast_audio",
+            self.model,
+            messages,
+            None,
+            lambda: self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                modalities=self.modalities,
+                audio={"voice": voice, "format": self.audio_format},
+                messages=messages,
+            ),
+        )
+        completion = raw.parse()
+        data = base64.b64decode(completion.choices[0].message.audio.data)
+        clip = decode_audio(data, self.audio_format, file=filename)
+        if filename is not None:
+            write_part(filename, data)
+        retries += getattr(raw, "retries_taken", 0)
+        return clip, data, completion.usage, retries
+
+
+class SpeechEngine:
+    """Streaming text-to-speech (audio.speech).
+
+    The audio arrives as raw PCM (24 kHz, 16 bit, mono) and is written to
+    the part file chunk by chunk while the rest is still being generated.
+    """
+
+    channels = 1
+    sample_width = 2
+    frame_rate = 24000
+
+    def __init__(self, client, settings):
+        self.client = client
+        self.model = settings.get("model", "gpt-4o-mini-tts")
+        self.chunk_size = settings.get("chunk_size", 4096)
+        self.audio_format = "wav"
+
+    def prompt(self, config, speaker_info, voice_expression, history, text):
+        return [
+            {
+                "role": "system",
+                "content": format_speech_instructions(
+                    config, speaker_info, voice_expression
+                ),
+            },
+            {"role": "user", "content": text},
+        ]
+
+    def synthesize(self, config, voice, messages, filename):
+        instructions, text = messages[0]["content"], messages[1]["content"]
+        pcm = bytearray()
+        temp_filename = f"{filename}.tmp"
+
+        def stream():
+            # The whole body is read here, so the response is closed by its
+            # own context manager on every attempt the scheduler makes
+            pcm.clear()
+            part = None
+            with self.client.audio.speech.with_streaming_response.create(
+                model=self.model,
+                voice=voice,
+                input=text,
+                instructions=instructions,
+                response_format="pcm",
+            ) as response:
+                try:
+                    if filename is not None:
+                        part = wave.open(temp_filename, "wb")
+                        part.setnchannels(self.channels)
+                        part.setsampwidth(self.sample_width)
+                        part.setframerate(self.frame_rate)
+                    for chunk in response.iter_bytes(self.chunk_size):
+                        pcm.extend(chunk)
+                        if part is not None:
+                            part.writeframes(chunk)
+                except BaseException:
+                    # Leave no partial part file behind when the stream breaks off
+                    if part is not None:
+                        part.close()
+                        os.remove(temp_filename)
+                    raise
+            if part is not None:
+                part.close()
+            return response
+
+        raw, retries = scheduled_call(
+            config, "podcast_audio", self.model, messages, None, stream
+        )
+        if filename is not None:
+            os.replace(temp_filename, filename)
+        clip = AudioClip(
+            memoryview(bytes(pcm)),
+            self.channels,
+            self.sample_width,
+            self.frame_rate,
+            filename,
+        )
+        retries += getattr(raw, "retries_taken", 0)
+        return clip, encode_wav(clip), None, retries
+
+
+class ToneEngine:
+    """Deterministic offline stand-in for benchmarking without the API.
+
+    Every voice gets its own tone, held for as long as the line would take
+    to say; `latency` adds a fixed delay per line.
+    """
+
+    model = "tone"
+    audio_format = "wav"
+
+    def __init__(self, client, settings):
+        self.frame_rate = settings.get("frame_rate", 24000)
+        self.seconds_per_word = settings.get("seconds_per_word", 0.35)
+        self.latency = settings.get("latency", 0.0)
+
+    def prompt(self, config, speaker_info, voice_expression, history, text):
+        return [{"role": "user", "content": text}]
+
+    def synthesize(self, config, voice, messages, filename):
+        text = messages[-1]["content"]
+        digest = hashlib.sha256(voice.encode("utf-8")).digest()
+        frequency = 150 + int.from_bytes(digest[:2], "big") % 250
+        frames = int(len(text.split()) * self.seconds_per_word * self.frame_rate)
+        step = 2 * math.pi * frequency / self.frame_rate
+        samples = array("h", (int(8000 * math.sin(step * n)) for n in range(frames)))
+        if sys.byteorder == "big":
+            samples.byteswap()
+        time.sleep(self.latency)
+        clip = AudioClip(memoryview(samples.tobytes()), 1, 2, self.frame_rate, filename)
+        data = encode_wav(clip)
+        if filename is not None:
+            write_part(filename, data)
+        return clip, data, None, 0
+
+
+ENGINES = {
+    "chat_audio": ChatAudioEngine,
+    "speech": SpeechEngine,
+    "tone": ToneEngine,
+}
+
+
+def check_engines(config):
+    """Fail with ConfigError if a speaker's engine is unknown or lacks its prompt"""
+    problems = []
+    for number, speaker in get_speakers(config).items():
+        engine = speaker.get("engine", "chat_audio")
+        if engine not in ENGINES:
+            problems.append(
+                f"speaker '{number}' uses unknown engine '{engine}' "
+                f"(one of: {', '.join(ENGINES)})"
+            )
+        elif engine == "speech" and "speech_instructions" not in get_prompts(config):
+            problems.append(
+                f"speaker '{number}' uses the speech engine, which needs "
+                "'prompts.speech_instructions'"
+            )
+    if problems:
+        raise ConfigError("Invalid configuration:\n- " + "\n- ".join(problems))
+
+
+def get_engine(client, speaker_info, config):
+    """Create the speech engine of a speaker (`engine`, default chat_audio).
+
+    The chat_audio engine uses models.podcast_audio itself, the others their
+    entry in models.podcast_audio.engines.
+    """
+    settings = get_models(config)["podcast_audio"]
+    name = speaker_info.get("engine", "chat_audio")
+    if name == "chat_audio":
+        return ChatAudioEngine(client, settings)
+    return ENGINES[name](client, settings.get("engines", {}).get(name, {}))
+
+
 def generate_audio(
     client,
     text,
@@ -57,15 +382,16 @@ def generate_audio(
     voice_expression,
     config,
 ):
-    models = get_models(config)
+    settings = get_models(config)["podcast_audio"]
+    engine = get_engine(client, speaker_info, config)
 
     # Get the last two messages from history
     recent_history = (
         speaker_history[-2:] if len(speaker_history) >= 2 else speaker_history
     )
 
-    # Format the messages using config_parser
-    messages = format_audio_generation_prompt(
+    # What the engine is sent; also the content the cache key is built from
+    messages = engine.prompt(
         config,
         speaker_info,
         voice_expression,
@@ -73,43 +399,80 @@ def generate_audio(
         text,
     )
 
-    try:
-        completion = client.chat.completions.create(
-            model=models["podcast_audio"]["model"],
-            modalities=models["podcast_audio"]["modalities"],
-            audio={"voice": voice, "format": models["podcast_audio"]["format"]},
-            messages=messages,
-        )
+    audio_format = engine.audio_format
+    filename = None
+    if settings.get("write_parts", True):
+        filename = os.path.join(file_prefix + f"_part_{index+1}.{audio_format}")
 
-        wav_bytes = base64.b64decode(completion.choices[0].message.audio.data)
-        filename = os.path.join(file_prefix + f"_part_{index+1}.wav")
+    cache = get_audio_cache(config)
+    key = None
+    started = time.perf_counter()
+    if cache is not None:
+        key = AudioCache.make_key(engine.model, voice, audio_format, messages)
+        data = cache.read(key, audio_format)
+        if data is not None:
+            if filename is not None and not cache.fetch(key, audio_format, filename):
+                write_part(filename, data)
+            record_call(
+                config,
+                "podcast_audio",
+                engine.model,
+                time.perf_counter() - started,
+                cached=True,
+            )
+            print(f"Reused cached audio for line {index+1}")
+            return decode_audio(data, audio_format, file=filename)
 
-        with open(filename, "wb") as f:
-            f.write(wav_bytes)
+    try:
+        clip, data, usage, retries = engine.synthesize(
+            config, voice, messages, filename
+        )
+        record_call(
+            config,
+            "podcast_audio",
+            engine.model,
+            time.perf_counter() - started,
+            usage=usage,
+            audio_seconds=clip.duration,
+            retries=retries,
+        )
+        if cache is not None:
+            cache.put(key, audio_format, data)
 
-        print(f"Successfully generated: {filename}")
-        return filename
+        print(f"Successfully generated line {index+1}")
+        return clip
 
     except Exception as e:
+        record_call(
+            config,
+            "podcast_audio",
+            engine.model,
+            time.perf_counter() - started,
+            error=str(e),
+        )
         print(f"Error generating audio: {str(e)}")
         print(f"Full error details: {e.__dict__}")
         raise
 
 
+def write_part(filename, data):
+    # Write to a new file so a cached file linked here is never modified
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as f:
+        f.write(data)
+    os.replace(temp_filename, filename)
+
+
 def main(
     script_path=None,
     output_prefix=None,
     run_id=None,
     config=None,
 ):
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     if config is None:
         raise ValueError("Config must be provided")
 
     models = get_models(config)
-    speakers = get_speakers(config)
     directories = get_directories(config)
     audio_dir = directories.get("audio", "data/audio")
     script_dir = directories.get("scripts", "data/scripts")
@@ -129,43 +492,140 @@ def main(
         print("Failed to parse script")
         return []
 
-    speaker_history = deque(maxlen=5)
     timestamp = run_id or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_prefix = output_prefix or f"audio_{timestamp}"
+    file_prefix = os.path.join(audio_dir, output_prefix)
+
+    # Lines finished by an earlier attempt of this run are not generated again
+    manifest = RunManifest(manifest_path(audio_dir, output_prefix))
+    manifest.set_script(content, total=len(parsed_lines))
+    return synthesize_lines(
+        get_client(config, "podcast_audio"),
+        parsed_lines,
+        file_prefix,
+        config,
+        manifest=manifest,
+    )
+
+
+def synthesize_lines(
+    client, lines, file_prefix, config, started_at=None, manifest=None
+):
+    """Generate audio for script lines concurrently and return their clips.
+
+    A line only needs the text of the lines before it as context, so each
+    line's history is taken from the script as it is read and up to
+    `models.podcast_audio.workers` lines are voiced at once. `lines` may be
+    any iterable, e.g. a queue fed by a script that is still being written.
+    Part files (if written) follow the line numbers and the decoded
+    AudioClips are returned in script order, ready for stitching.
+    The time from `started_at` (default: now) to the first audio file and
+    the latency of every line are reported.
 
-    audio_files = []
-    for i, line in enumerate(parsed_lines):
-        print(f"\nProcessing line {i+1} of {len(parsed_lines)}")
+    A line whose response fails (a broken stream, undecodable audio) is
+    retried `line_retries` times with backoff; API errors are left to the
+    scheduler's retries. With a `manifest`, lines whose part files it
+    records are read back instead of voiced and every result is recorded as
+    soon as it is known.
+    """
+    check_engines(config)
+    speakers = get_speakers(config)
+    settings = get_models(config)["podcast_audio"]
+    workers = max(1, settings.get("workers", 1))
+    line_retries = settings.get("line_retries", 2)
+    retry_delay = settings.get("line_retry_delay", 2.0)
+    started_at = started_at or time.perf_counter()
+    total = len(lines) if hasattr(lines, "__len__") else None
+    first_audio = threading.Event()
+
+    def voice_line(i, line, history):
         speaker_num = line["speaker"]
-        voice = speakers[speaker_num]["voice"]
+        line_started = time.perf_counter()
+        for attempt in range(line_retries + 1):
+            try:
+                clip = generate_audio(
+                    client,
+                    line["text"],
+                    history,
+                    speakers[speaker_num],
+                    speakers[speaker_num]["voice"],
+                    file_prefix,
+                    i,
+                    line["voice_expression"],
+                    config,
+                )
+                break
+            except Exception as e:
+                # The scheduler has already retried API errors; only retry
+                # what happens after a response, e.g. a broken stream or
+                # audio that cannot be decoded
+                if attempt == line_retries or isinstance(e, RETRYABLE_ERRORS):
+                    if manifest is not None:
+                        manifest.mark_failed(i, str(e), attempt + 1)
+                    raise
+                delay = retry_delay * 2**attempt * random.uniform(0.5, 1)
+                print(f"Line {i+1} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        if manifest is not None:
+            manifest.mark_done(i, clip.file, attempt + 1)
+        latency = time.perf_counter() - line_started
+        print(f"Line {i+1} of {total or '?'} done in {latency:.1f}s")
+        if not first_audio.is_set():
+            first_audio.set()
+            print(f"Time to first audio: {time.perf_counter() - started_at:.1f}s")
+        return clip, latency
 
-        try:
-            file_prefix = output_prefix or f"audio_{timestamp}"
-            file_prefix = os.path.join(audio_dir, file_prefix)
-            audio_file = generate_audio(
-                client,
-                line["text"],
-                list(speaker_history),
-                speakers[speaker_num],
-                voice,
-                file_prefix,
-                i,
-                line["voice_expression"],
-                config,
-            )
+    speaker_history = deque(maxlen=5)
+    futures = []
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, line in enumerate(lines):
+            part_file = manifest.file(i) if manifest is not None else None
+            if part_file is not None:
+                futures.append(part_file)
+                skipped += 1
+            else:
+                futures.append(
+                    executor.submit(voice_line, i, line, list(speaker_history))
+                )
             speaker_history.append(
-                {"role": f"Speaker {speaker_num}", "content": line["text"]}
+                {"role": f"Speaker {line['speaker']}", "content": line["text"]}
             )
-            audio_files.append(audio_file)
 
+    clips = []
+    latencies = []
+    failed = []
+    for i, future in enumerate(futures):
+        if isinstance(future, str):
+            # Done in an earlier attempt
+            clips.append(read_clip(future))
+            continue
+        try:
+            clip, latency = future.result()
+            clips.append(clip)
+            latencies.append(latency)
         except Exception as e:
+            # Skip the line instead of dropping the rest of the episode; a
+            # resumed run retries it
             print(f"Failed to process line {i+1}: {str(e)}")
-            break
+            failed.append(i + 1)
 
-    return audio_files
+    if skipped:
+        print(f"Reused {skipped} lines from the previous attempt")
+    if latencies:
+        print(
+            f"Voiced {len(latencies)} lines with {workers} workers in "
+            f"{time.perf_counter() - started_at:.1f}s "
+            f"(per line: avg {sum(latencies) / len(latencies):.1f}s, "
+            f"max {max(latencies):.1f}s)"
+        )
+    if failed:
+        print(f"Lines without audio: {', '.join(map(str, failed))}")
+    return clips
 
 
 if __name__ == "__main__":
     config = load_config()
-    audio_files = main(config=config)
-    for file in audio_files:
-        print(file)
+    clips = main(config=config)
+    for clip in clips:
+        print(clip.file or f"{clip.duration:.1f}s in memory")
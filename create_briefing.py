@@ -1,13 +1,16 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
 from datetime import datetime
 
 from config_parser import (
     load_config,
     get_directories,
     format_briefing_prompt,
+    require_keys,
 )
+from batch_jobs import run_batch
+from llm_cache import create_completion, report_cache_stats
+from openai_client import get_client
+from telemetry import report_run
 
 
 def read_input_file(file_path: str) -> str:
@@ -20,35 +23,41 @@ def read_input_file(file_path: str) -> str:
         return None
 
 
+def briefing_request(config, content: str) -> dict:
+    """Completion parameters for the briefing of `content`."""
+    return {
+        "model": "gpt-4o",  # You might want to get this from config
+        # Prepare messages using config_parser
+        "messages": format_briefing_prompt(config, content),
+        "temperature": 0.7,
+        "max_tokens": 5000,
+    }
+
+
+def save_briefing(briefing: str, output_file: str):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(briefing)
+    print(f"Briefing saved to: {output_file}")
+
+
 def create_briefing(content: str, output_file: str = None, config=None) -> str:
     """Create a briefing from the input content using OpenAI."""
-    # Load environment variables
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     if config is None:
         raise ValueError("Config must be provided")
 
-    # Prepare messages using config_parser
-    messages = format_briefing_prompt(config, content)
-
     try:
         # Generate the briefing
-        response = client.chat.completions.create(
-            model="gpt-4o",  # You might want to get this from config
-            messages=messages,
-            temperature=0.7,
-            max_tokens=5000,
+        briefing = create_completion(
+            get_client(config, "briefing"),
+            "briefing",
+            config,
+            **briefing_request(config, content),
         )
 
-        briefing = response.choices[0].message.content
-
         # Save the briefing if output file is specified
         if output_file:
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(briefing)
-            print(f"Briefing saved to: {output_file}")
+            save_briefing(briefing, output_file)
 
         return briefing
 
@@ -57,13 +66,54 @@ def create_briefing(content: str, output_file: str = None, config=None) -> str:
         return None
 
 
-def main():
+def create_briefings_batch(input_files, output_dir: str, config) -> list:
+    """Create one briefing per input file through a single batch job.
+
+    Returns the paths of the briefings that were written.
+    """
+    contents = [(path, read_input_file(path)) for path in input_files]
+    contents = [(path, content) for path, content in contents if content]
+    if not contents:
+        return []
+
+    briefings = run_batch(
+        "briefing",
+        config,
+        [briefing_request(config, content) for _, content in contents],
+    )
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    written = []
+    for (path, _), briefing in zip(contents, briefings):
+        if briefing is None:
+            print(f"No briefing returned for {path}")
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_file = os.path.join(output_dir, f"briefing_{name}_{timestamp}.txt")
+        save_briefing(briefing, output_file)
+        written.append(output_file)
+    return written
+
+
+def main(input_files=None, batch=False):
     # Load configuration
     config = load_config()
+    require_keys(config, "briefing")
     data_dir = get_directories(config)["data"]
+    input_files = input_files or [os.path.join(data_dir, "input", "options.txt")]
+
+    if batch:
+        print(f"\nGenerating {len(input_files)} briefings in a batch...")
+        written = create_briefings_batch(
+            input_files, os.path.join(data_dir, "briefings"), config
+        )
+        print(f"\n{len(written)} briefings generated")
+        report_cache_stats()
+        report_run()
+        return
 
     # Define input and output paths
-    input_file = os.path.join(data_dir, "input", "options.txt")
+    input_file = input_files[0]
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = os.path.join(data_dir, "briefings", f"briefing_{timestamp}.txt")
 
@@ -88,7 +138,24 @@ def main():
         print("=" * 80)
     else:
         print("Failed to generate briefing")
+    report_cache_stats()
+    report_run()
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create briefings from text files")
+    parser.add_argument(
+        "input_files",
+        nargs="*",
+        help="Input text files (default: data/input/options.txt)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Create one briefing per input file through a batch job",
+    )
+    args = parser.parse_args()
+
+    main(args.input_files, args.batch)
@@ -1,6 +1,4 @@
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
 import datetime
 
 from config_parser import (
@@ -9,22 +7,14 @@ from config_parser import (
     format_script_prompt,
     format_screenwriter_prompt,
 )
+from create_audio import ScriptLineParser
+from llm_cache import create_completion, stream_completion
+from openai_client import get_client
 
 
-def create_dialogue(
-    main_content,
-    output_file=None,
-    config=None,
-):
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    if config is None:
-        raise ValueError("Config must be provided")
-
+def generate_raw_script(client, main_content, config):
+    """Write the first draft of the podcast script"""
     models = get_models(config)
-    directories = get_directories(config)
-    script_dir = directories["scripts"]
 
     # Prepare the formatted script prompt
     script_prompts = format_script_prompt(config, main_content)
@@ -34,35 +24,30 @@ def create_dialogue(
     ]
 
     # Generate the initial script
-    response = client.chat.completions.create(
+    raw_script = create_completion(
+        client,
+        "podcast_script",
+        config,
         model=models["podcast_script"]["model"],
         messages=messages,
         temperature=models["podcast_script"]["temperature"],
         max_tokens=models["podcast_script"]["max_tokens"],
     )
-
-    raw_script = response.choices[0].message.content
     print(f"🤖 raw script created - now enhancing ")
+    return raw_script
 
+
+def screenwriter_messages(config, raw_script):
     # Prepare the formatted screenwriter prompt
     screenwriter_prompts = format_screenwriter_prompt(config, raw_script)
-    messages = [
+    return [
         {"role": "system", "content": screenwriter_prompts["system"]},
         {"role": "user", "content": screenwriter_prompts["user"]},
     ]
 
-    # Generate the enhanced script
-    response = client.chat.completions.create(
-        model=models["podcast_script"]["model"],
-        messages=messages,
-        temperature=models["podcast_script"]["temperature"],
-        max_tokens=models["podcast_script"]["max_tokens"],
-    )
-
-    final_script = response.choices[0].message.content
-    print(f"🤖 final script created - now saving")
 
-    # Save the script
+def save_script(final_script, output_file, config):
+    script_dir = get_directories(config)["scripts"]
     if output_file:
         output_path = os.path.join(script_dir, output_file)
     else:
@@ -73,4 +58,73 @@ def create_dialogue(
         f.write(final_script)
 
     print(f"Script saved to {output_path}")
+    return output_path
+
+
+def create_dialogue(
+    main_content,
+    output_file=None,
+    config=None,
+):
+    if config is None:
+        raise ValueError("Config must be provided")
+
+    models = get_models(config)
+    raw_script = generate_raw_script(
+        get_client(config, "podcast_script"), main_content, config
+    )
+
+    # Generate the enhanced script
+    final_script = create_completion(
+        get_client(config, "screenwriter"),
+        "screenwriter",
+        config,
+        model=models["podcast_script"]["model"],
+        messages=screenwriter_messages(config, raw_script),
+        temperature=models["podcast_script"]["temperature"],
+        max_tokens=models["podcast_script"]["max_tokens"],
+    )
+    print(f"🤖 final script created - now saving")
+
+    save_script(final_script, output_file, config)
+    return final_script
+
+
+def stream_dialogue(
+    main_content,
+    on_line,
+    output_file=None,
+    config=None,
+):
+    """Create the script like `create_dialogue`, streaming the screenwriter pass.
+
+    Every line is handed to `on_line` as soon as its tuple is complete, so
+    audio generation can start before the script is finished.
+    """
+    if config is None:
+        raise ValueError("Config must be provided")
+
+    models = get_models(config)
+    raw_script = generate_raw_script(
+        get_client(config, "podcast_script"), main_content, config
+    )
+
+    parser = ScriptLineParser()
+    parts = []
+    for delta in stream_completion(
+        get_client(config, "screenwriter"),
+        "screenwriter",
+        config,
+        model=models["podcast_script"]["model"],
+        messages=screenwriter_messages(config, raw_script),
+        temperature=models["podcast_script"]["temperature"],
+        max_tokens=models["podcast_script"]["max_tokens"],
+    ):
+        parts.append(delta)
+        for line in parser.feed(delta):
+            on_line(line)
+    final_script = "".join(parts)
+    print(f"🤖 final script created - now saving")
+
+    save_script(final_script, output_file, config)
     return final_script
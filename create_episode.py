@@ -1,17 +1,12 @@
 from pydub import AudioSegment
 from pydub.effects import compress_dynamic_range, normalize
 import os
-import json
 
-# Load base configuration
-with open("based_config.json", "r") as f:
-    config = json.load(f)
-    AUDIO_DIR = config["directories"]["audio"]
-    EPISODE_DIR = config["directories"]["episodes"]
+from config_parser import load_config, get_directories
 
 
 def load_audio(run_id=None, directories=None):
-    directories = directories or {"audio": AUDIO_DIR}
+    directories = directories or get_directories(load_config())
     audio_dir = directories["audio"]
 
     # Load all audio files for the given run_id
@@ -20,11 +15,49 @@ def load_audio(run_id=None, directories=None):
         for f in os.listdir(audio_dir)
         if f.startswith(f"audio_{run_id}_part_") and f.endswith(".wav")
     ]
-    audio_files.sort()
+    # Sort by part number so that part_10 comes after part_9
+    audio_files.sort(key=lambda f: int(f.rsplit("_part_", 1)[1][: -len(".wav")]))
     segments = [AudioSegment.from_wav(file) for file in audio_files]
     return segments
 
 
+def stitch_clips(clips):
+    """Join decoded line audio (AudioClips) into one segment.
+
+    Clips in the same format are concatenated as raw PCM in a single copy;
+    otherwise every clip is converted to the format of the first.
+    """
+    if not clips:
+        return AudioSegment.empty()
+    first = clips[0]
+    audio_format = (first.channels, first.sample_width, first.frame_rate)
+    if all(
+        (clip.channels, clip.sample_width, clip.frame_rate) == audio_format
+        for clip in clips
+    ):
+        data = b"".join(clip.pcm for clip in clips)
+    else:
+        data = b"".join(
+            AudioSegment(
+                data=bytes(clip.pcm),
+                channels=clip.channels,
+                sample_width=clip.sample_width,
+                frame_rate=clip.frame_rate,
+            )
+            .set_channels(first.channels)
+            .set_sample_width(first.sample_width)
+            .set_frame_rate(first.frame_rate)
+            .raw_data
+            for clip in clips
+        )
+    return AudioSegment(
+        data=data,
+        channels=first.channels,
+        sample_width=first.sample_width,
+        frame_rate=first.frame_rate,
+    )
+
+
 def stitch_audio(segments):
     combined = AudioSegment.empty()
     for segment in segments:
@@ -71,7 +104,7 @@ def add_intro_outro(
 
 
 def save_audio(audio, output_filename, run_id=None, directories=None):
-    directories = directories or {"episodes": EPISODE_DIR}
+    directories = directories or get_directories(load_config())
     episode_dir = directories["episodes"]
 
     if run_id:
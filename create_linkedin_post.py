@@ -1,49 +1,12 @@
-import sqlite3
-from openai import OpenAI
 from datetime import datetime
 import os
-from dotenv import load_dotenv
-from get_information import setup_database
+from storage import save_blog_post, get_latest_articles
 from config import POST_DIR, MODELS
-
-load_dotenv()
-
-
-def save_blog_post(post_content, article_ids):
-    conn, cursor = setup_database()  # This will ensure the table exists
-
-    cursor.execute(
-        """
-        INSERT INTO blog_posts (post_content, source_articles)
-        VALUES (?, ?)
-        """,
-        (post_content, ",".join(map(str, article_ids))),
-    )
-
-    conn.commit()
-    conn.close()
-
-
-def get_latest_articles():
-    conn = sqlite3.connect("content.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT id, date, title, content 
-        FROM articles 
-        ORDER BY date DESC 
-        LIMIT 3
-    """
-    )
-
-    articles = cursor.fetchall()
-    conn.close()
-    return articles
+from openai_client import get_client
 
 
 def create_linkedin_post(articles, output_file=None):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
 
     # Prepare the articles for the prompt
     articles_text = "\n\n".join(
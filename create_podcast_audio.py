@@ -1,12 +1,11 @@
 import base64
-from openai import OpenAI
-from dotenv import load_dotenv
 import re
 import os
 from collections import deque
 import datetime
 from config import AUDIO_DIR, SCRIPT_DIR, SPEAKERS, MODELS
 from utils import get_latest_file
+from openai_client import get_client
 
 
 def read_podcast_script(filepath):
@@ -86,8 +85,7 @@ def generate_audio(
 
 
 def main(script_path=None, output_prefix=None, run_id=None):
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
 
     print("\n=== Starting Script Processing ===")
     # Step 1: Process the script
@@ -1,10 +1,9 @@
 import openai
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
 import datetime
 from config import MODELS, SCRIPT_DIR, POST_DIR, SPEAKERS, PROMPTS, PODCAST_STYLES
 from utils import get_latest_file
+from openai_client import get_client
 
 
 def create_podcast_script(
@@ -14,9 +13,7 @@ def create_podcast_script(
     outro_style="relaxed and engaging",
     output_file=None,
 ):
-    # Load environment variables
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
 
     # Format the user prompt with dynamic content
     user_prompt = PROMPTS["script"]["user"].format(
@@ -1,8 +1,5 @@
-import sqlite3
 from datetime import datetime
-from dotenv import load_dotenv
-from get_information import setup_database
-from openai import OpenAI
+from storage import save_blog_post, get_latest_articles
 import os
 
 from config_parser import (
@@ -11,45 +8,11 @@ from config_parser import (
     get_directories,
     format_linkedin_post_prompt,
 )
-
-
-def save_blog_post(post_content, article_ids):
-    conn, cursor = setup_database()  # This will ensure the table exists
-
-    cursor.execute(
-        """
-        INSERT INTO blog_posts (post_content, source_articles)
-        VALUES (?, ?)
-        """,
-        (post_content, ",".join(map(str, article_ids))),
-    )
-
-    conn.commit()
-    conn.close()
-
-
-def get_latest_articles():
-    conn = sqlite3.connect("content.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT id, date, title, content 
-        FROM articles 
-        ORDER BY date DESC 
-        LIMIT 3
-    """
-    )
-
-    articles = cursor.fetchall()
-    conn.close()
-    return articles
+from llm_cache import create_completion
+from openai_client import get_client
 
 
 def create_linkedin_post(article_content, output_file=None, config=None):
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
     if config is None:
         raise ValueError("Config must be provided")
 
@@ -60,15 +23,16 @@ def create_linkedin_post(article_content, output_file=None, config=None):
     # Prepare messages using config_parser
     messages = format_linkedin_post_prompt(config, article_content)
 
-    response = client.chat.completions.create(
+    linkedin_post = create_completion(
+        get_client(config, "linkedin_post"),
+        "linkedin_post",
+        config,
         model=models["linkedin_post"]["model"],
         messages=messages,
         temperature=models["linkedin_post"]["temperature"],
         max_tokens=models["linkedin_post"]["max_tokens"],
     )
 
-    linkedin_post = response.choices[0].message["content"]
-
     # Save the post
     if output_file:
         output_path = os.path.join(post_dir, output_file)
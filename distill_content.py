@@ -1,16 +1,23 @@
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import PyPDF2
 from tqdm import tqdm
-from dotenv import load_dotenv
 
 from config_parser import (
     load_config,
     get_models,
     get_directories,
     format_distillation_prompt,
+    format_distillation_merge_prompt,
 )
+from chunking import chunk_text, get_token_counter, iter_chunks, merge_budget
+from batch_jobs import run_batch
+from llm_cache import create_completion, report_cache_stats
+from openai_client import get_client
+from telemetry import report_run
 
 
 def validate_pdf(file_path: str) -> bool:
@@ -42,8 +49,10 @@ def get_pdf_metadata(file_path: str) -> Optional[dict]:
         return None
 
 
-def extract_text_from_pdf(file_path: str, max_chars: int = 100000) -> Optional[str]:
-    """Extract text content from PDF file."""
+def extract_text_from_pdf(
+    file_path: str, max_chars: Optional[int] = None
+) -> Optional[str]:
+    """Extract text content from PDF file, optionally capped at `max_chars`."""
     if not validate_pdf(file_path):
         return None
 
@@ -60,7 +69,7 @@ def extract_text_from_pdf(file_path: str, max_chars: int = 100000) -> Optional[s
                 page = pdf_reader.pages[page_num]
                 text = page.extract_text()
 
-                if total_chars + len(text) > max_chars:
+                if max_chars is not None and total_chars + len(text) > max_chars:
                     remaining_chars = max_chars - total_chars
                     extracted_text.append(text[:remaining_chars])
                     print(
@@ -80,8 +89,21 @@ def extract_text_from_pdf(file_path: str, max_chars: int = 100000) -> Optional[s
         return None
 
 
+def iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """Yield the text of each page, reading one page at a time."""
+    with open(file_path, "rb") as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        print(f"Processing PDF with {len(pdf_reader.pages)} pages...")
+        for page in tqdm(pdf_reader.pages, desc="Reading pages"):
+            yield page.extract_text() or ""
+
+
 def create_chunks(text: str, chunk_size: int) -> List[str]:
-    """Split text into chunks at word boundaries."""
+    """Split text into chunks of `chunk_size` characters at word boundaries.
+
+    Superseded by `chunking.chunk_text`; kept as the baseline for
+    `chunking.py` benchmarks.
+    """
     words = text.split()
     chunks = []
     current_chunk = []
@@ -103,42 +125,259 @@ def create_chunks(text: str, chunk_size: int) -> List[str]:
     return chunks
 
 
-def process_chunk(client: OpenAI, chunk: str, chunk_num: int, config) -> str:
+def process_chunk(
+    client: OpenAI,
+    chunk: str,
+    chunk_num: int,
+    config,
+    timeout: Optional[float] = None,
+) -> str:
     """Process a single chunk of text."""
     models = get_models(config)
+    extra = {"timeout": timeout} if timeout else {}
 
     messages = format_distillation_prompt(config, chunk)
 
     try:
-        response = client.chat.completions.create(
+        processed_text = create_completion(
+            client,
+            "content_distillation",
+            config,
             model=models["content_distillation"]["model"],
             messages=messages,
             temperature=models["content_distillation"]["temperature"],
             max_tokens=models["content_distillation"]["max_tokens"],
-        )
+            **extra,
+        ).strip()
 
-        processed_text = response.choices[0].message.content.strip()
-
-        print(f"\n{'='*40} Chunk {chunk_num} {'='*40}")
-        print(f"INPUT TEXT:\n{chunk[:500]}...")
-        print(f"\nPROCESSED TEXT:\n{processed_text[:500]}...")
-        print(f"{'='*90}\n")
+        # tqdm.write keeps the progress bar intact while workers print
+        tqdm.write(f"\n{'='*40} Chunk {chunk_num} {'='*40}")
+        tqdm.write(f"INPUT TEXT:\n{chunk[:500]}...")
+        tqdm.write(f"\nPROCESSED TEXT:\n{processed_text[:500]}...")
+        tqdm.write(f"{'='*90}\n")
 
         return processed_text
 
     except Exception as e:
-        print(f"Error processing chunk {chunk_num}: {str(e)}")
+        tqdm.write(f"Error processing chunk {chunk_num}: {str(e)}")
         return chunk
 
 
-def main(pdf_path: str, output_file: Optional[str] = None) -> Optional[str]:
-    """Main function to process PDF content."""
-    # Load environment variables
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def distill_chunks(client: OpenAI, chunks: List[str], config) -> List[str]:
+    """Distill chunks concurrently and return the results in chunk order.
+
+    The number of parallel requests and the per-chunk timeout come from
+    `models.content_distillation.workers` and `chunk_timeout`. A chunk that
+    fails or times out is kept as is.
+    """
+    settings = get_models(config)["content_distillation"]
+    workers = max(1, settings.get("workers", 1))
+    timeout = settings.get("chunk_timeout")
+
+    results: List[Optional[str]] = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_chunk, client, chunk, i + 1, config, timeout): i
+            for i, chunk in enumerate(chunks)
+        }
+        with tqdm(total=len(chunks), desc="Processing chunks") as progress:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                progress.update(1)
+    return results
+
+
+def merge_summaries(
+    client: OpenAI, summaries: List[str], config, timeout: Optional[float] = None
+) -> str:
+    """Merge consecutive partial summaries into one.
+
+    Errors are raised rather than answered with the joined summaries, which
+    could be `fan_in` times larger than a summary and overflow the next
+    level's merge.
+    """
+    if len(summaries) == 1:
+        return summaries[0]
+
+    models = get_models(config)
+    extra = {"timeout": timeout} if timeout else {}
+
+    return create_completion(
+        client,
+        "distillation_merge",
+        config,
+        model=models["content_distillation"]["model"],
+        messages=format_distillation_merge_prompt(config, summaries),
+        temperature=models["content_distillation"]["temperature"],
+        max_tokens=models["content_distillation"]["max_tokens"],
+        **extra,
+    ).strip()
+
+
+def distill_hierarchical(client: OpenAI, pdf_path: str, config) -> Optional[str]:
+    """Distill a PDF of any size with a bounded amount of memory.
+
+    Pages are streamed into token chunks that are distilled in parallel,
+    with at most `max_in_flight` chunks pending. Summaries are merged like
+    an LSM tree: every `merge_fan_in` summaries on a level become one on
+    the next, so only a few summaries per level are held at a time. The
+    remaining summaries are then merged, level by level, until they fit
+    `target_tokens`.
+    """
+    if not validate_pdf(pdf_path):
+        return None
+
+    settings = get_models(config)["content_distillation"]
+    workers = max(1, settings.get("workers", 1))
+    timeout = settings.get("chunk_timeout")
+    max_in_flight = max(workers, settings.get("max_in_flight", 2 * workers))
+    target_tokens = settings.get("target_tokens", 3000)
+    count_tokens = get_token_counter(settings["model"])
+
+    # Every summary is at most max_tokens long, so the fan-in is bounded
+    # by how many of them fit into one merge request.
+    fan_in = min(
+        settings.get("merge_fan_in", 4),
+        merge_budget(config, count_tokens) // settings["max_tokens"],
+    )
+    if fan_in < 2:
+        raise ValueError(
+            "content_distillation leaves no room to merge summaries: "
+            "raise context_window or lower max_tokens"
+        )
+
+    levels: List[List[str]] = []
+
+    def add_summary(summary: str):
+        level = 0
+        while True:
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(summary)
+            if len(levels[level]) < fan_in:
+                return
+            summary = merge_summaries(client, levels[level], config, timeout)
+            levels[level] = []
+            level += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        chunk_count = 0
+        try:
+            for chunk in iter_chunks(iter_pdf_pages(pdf_path), config):
+                chunk_count += 1
+                pending.append(
+                    executor.submit(
+                        process_chunk, client, chunk, chunk_count, config, timeout
+                    )
+                )
+                # Consume in submission order so summaries stay in document order
+                while len(pending) >= max_in_flight or (pending and pending[0].done()):
+                    add_summary(pending.popleft().result())
+            while pending:
+                add_summary(pending.popleft().result())
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            for future in pending:
+                future.cancel()
+            return None
+
+        # Higher levels hold the earlier parts of the document
+        summaries = [summary for level in reversed(levels) for summary in level]
+        depth = len(levels)
+        while (
+            len(summaries) > 1
+            and sum(count_tokens(summary) for summary in summaries) > target_tokens
+        ):
+            groups = [
+                summaries[i : i + fan_in] for i in range(0, len(summaries), fan_in)
+            ]
+            try:
+                summaries = list(
+                    executor.map(
+                        lambda group: merge_summaries(client, group, config, timeout),
+                        groups,
+                    )
+                )
+            except Exception as e:
+                print(f"An error occurred: {str(e)}")
+                return None
+            depth += 1
+
+    print(
+        f"\nDistilled {chunk_count} chunks over {depth} levels "
+        f"into {len(summaries)} sections"
+    )
+    return "\n\n".join(summaries)
+
+
+def distill_batch(pdf_path: str, config, mode: str = "flat") -> Optional[str]:
+    """Distill all chunks through the batch backend instead of live requests.
+
+    In hierarchical mode the summaries are then merged in further batch
+    rounds, one per level, until they fit `target_tokens`. A chunk or group
+    without a batch result is kept as is.
+    """
+    if not validate_pdf(pdf_path):
+        return None
 
+    settings = get_models(config)["content_distillation"]
+    params = {
+        "model": settings["model"],
+        "temperature": settings["temperature"],
+        "max_tokens": settings["max_tokens"],
+    }
+
+    chunks = list(iter_chunks(iter_pdf_pages(pdf_path), config))
+    print(f"\nBatching {len(chunks)} chunks...")
+    results = run_batch(
+        "content_distillation",
+        config,
+        [
+            dict(params, messages=format_distillation_prompt(config, chunk))
+            for chunk in chunks
+        ],
+    )
+    summaries = [result or chunk for result, chunk in zip(results, chunks)]
+    if mode != "hierarchical":
+        return " ".join(summaries)
+
+    count_tokens = get_token_counter(settings["model"])
+    fan_in = max(
+        2,
+        min(
+            settings.get("merge_fan_in", 4),
+            merge_budget(config, count_tokens) // settings["max_tokens"],
+        ),
+    )
+    while len(summaries) > 1 and sum(
+        count_tokens(summary) for summary in summaries
+    ) > settings.get("target_tokens", 3000):
+        groups = [summaries[i : i + fan_in] for i in range(0, len(summaries), fan_in)]
+        results = run_batch(
+            "distillation_merge",
+            config,
+            [
+                dict(params, messages=format_distillation_merge_prompt(config, group))
+                for group in groups
+            ],
+        )
+        summaries = [
+            result or "\n\n".join(group) for result, group in zip(results, groups)
+        ]
+    return "\n\n".join(summaries)
+
+
+def main(
+    pdf_path: str,
+    output_file: Optional[str] = None,
+    mode: Optional[str] = None,
+    batch: bool = False,
+) -> Optional[str]:
+    """Main function to process PDF content."""
     # Load configuration
     config = load_config()
+    client = get_client(config, "content_distillation")
     models = get_models(config)
     data_dir = get_directories(config)["data"]
 
@@ -152,23 +391,31 @@ def main(pdf_path: str, output_file: Optional[str] = None) -> Optional[str]:
         for key, value in metadata["metadata"].items():
             print(f"{key}: {value}")
 
-    # Extract text
-    print("\nExtracting text...")
-    extracted_text = extract_text_from_pdf(pdf_path)
-    if not extracted_text:
-        return None
-
-    # Process text in chunks
-    chunks = create_chunks(extracted_text, models["content_distillation"]["chunk_size"])
-    processed_chunks = []
-
-    print(f"\nProcessing {len(chunks)} chunks...")
-    for i, chunk in enumerate(tqdm(chunks, desc="Processing chunks")):
-        processed_chunk = process_chunk(client, chunk, i + 1, config)
-        processed_chunks.append(processed_chunk)
-
-    # Combine processed chunks
-    final_text = " ".join(processed_chunks)
+    mode = mode or models["content_distillation"].get("mode", "flat")
+    if batch:
+        final_text = distill_batch(pdf_path, config, mode)
+        if not final_text:
+            return None
+    elif mode == "hierarchical":
+        print("\nDistilling pages hierarchically...")
+        final_text = distill_hierarchical(client, pdf_path, config)
+        if not final_text:
+            return None
+    else:
+        # Extract text
+        print("\nExtracting text...")
+        extracted_text = extract_text_from_pdf(pdf_path)
+        if not extracted_text:
+            return None
+
+        # Process text in chunks
+        chunks = chunk_text(extracted_text, config)
+
+        print(f"\nProcessing {len(chunks)} chunks...")
+        processed_chunks = distill_chunks(client, chunks, config)
+
+        # Combine processed chunks
+        final_text = " ".join(processed_chunks)
 
     # Save to file
     if output_file is None:
@@ -179,6 +426,8 @@ def main(pdf_path: str, output_file: Optional[str] = None) -> Optional[str]:
         f.write(final_text)
 
     print(f"\nProcessed content saved to: {output_file}")
+    report_cache_stats()
+    report_run()
     return output_file
 
 
@@ -190,6 +439,17 @@ if __name__ == "__main__":
     )
     parser.add_argument("pdf_path", help="Path to the PDF file")
     parser.add_argument("--output", help="Output file path (optional)")
+    parser.add_argument(
+        "--mode",
+        choices=["flat", "hierarchical"],
+        help="Distill chunk by chunk (flat) or merge summaries until they fit "
+        "target_tokens (hierarchical). Defaults to the configured mode.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit the chunks as a batch job (cheaper, but not interactive)",
+    )
     args = parser.parse_args()
 
-    main(args.pdf_path, args.output)
+    main(args.pdf_path, args.output, args.mode, args.batch)
@@ -1,187 +1,641 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
+import threading
+import time
 import pytz
-import sqlite3
 import hashlib
 import os
+from dataclasses import replace
 
+import storage
+from http_cache import HttpCache
+from sources import INSIDE_PARADEPLATZ, load_sources
 
-def setup_database():
-    """Create the database and tables if they don't exist"""
-    conn = sqlite3.connect(os.path.join("data", "content.db"))
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            article_hash TEXT UNIQUE,
-            date TEXT,
-            title TEXT,
-            author TEXT,
-            link TEXT,
-            content TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """
-    )
 
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS blog_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_content TEXT,
-            source_articles TEXT, -- Store article IDs used
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def create_session(pool_size=8):
+    """Create a keep-alive HTTP session shared by all requests of a crawl"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+class HostLimiter:
+    """Cap the number of in-flight requests per host and space them out.
+
+    Every host gets `per_host_limit` concurrent requests and no rate limit
+    unless configured otherwise with `configure`.
     """
-    )
-    conn.commit()
-    return conn, cursor
 
+    def __init__(self, per_host_limit=4):
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+        self._intervals = {}
+        self._next_request = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host, max_concurrency=None, requests_per_second=None):
+        with self._lock:
+            self._semaphores[host] = threading.BoundedSemaphore(
+                max_concurrency or self.per_host_limit
+            )
+            if requests_per_second:
+                self._intervals[host] = 1.0 / requests_per_second
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
 
-def get_recent_articles():
-    # Set up timezone for Switzerland
-    zurich_tz = pytz.timezone("Europe/Zurich")
-    current_date = datetime.now(zurich_tz)
+    def _wait_for_slot(self, host):
+        interval = self._intervals.get(host)
+        if not interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request.get(host, now))
+            self._next_request[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
 
-    # Setup database
-    conn, cursor = setup_database()
+    def acquire(self, url):
+        """Wait for a request slot of the url's host; pair with `release`"""
+        host = urlparse(url).netloc
+        self._semaphore(host).acquire()
+        self._wait_for_slot(host)
 
+    def release(self, url):
+        self._semaphore(urlparse(url).netloc).release()
+
+    @contextmanager
+    def limit(self, url):
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+
+def _html_parser():
+    """Prefer lxml when it is installed, it is several times faster"""
     try:
-        # Send request with headers to mimic browser
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        import lxml  # noqa: F401
+
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+HTML_PARSER = _html_parser()
+
+
+def _strainer(selector):
+    """Build a SoupStrainer for simple `tag`, `.class` or `tag.class` selectors.
+
+    Returns None for selectors a strainer cannot express; those pages are
+    parsed in full.
+    """
+    if (
+        "," in selector
+        or " " in selector.strip()
+        or any(c in selector for c in "#[:>+~")
+    ):
+        return None
+    tag, _, css_class = selector.strip().partition(".")
+    if "." in css_class:
+        return None
+    if css_class:
+        return SoupStrainer(tag or True, class_=css_class)
+    return SoupStrainer(tag)
+
+
+def extract_article_content(html, source=INSIDE_PARADEPLATZ, fast=True):
+    """Extract the article body from an article page as newline separated paragraphs.
+
+    In `fast` mode only the content element is parsed (with lxml when
+    available) and excluded paragraphs are collected once. Otherwise the
+    page is handled the original way, kept as the benchmark baseline: the
+    whole document is parsed with html.parser and every paragraph's
+    ancestors are checked against the excluded elements.
+    """
+    strainer = _strainer(source.content_selector) if fast else None
+    if strainer is not None:
+        article_soup = BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
+    else:
+        article_soup = BeautifulSoup(html, HTML_PARSER if fast else "html.parser")
+
+    # Find the main content element
+    content = article_soup.select_one(source.content_selector)
+    if not content:
+        return None
+
+    # Paragraphs nested in captions, share buttons etc. are skipped
+    excluded = []
+    if source.excluded_selectors:
+        excluded = content.select(", ".join(source.excluded_selectors))
+    if fast:
+        skipped = {
+            id(p)
+            for element in excluded
+            for p in element.select(source.paragraph_selector)
         }
-        response = requests.get("https://insideparadeplatz.ch/", headers=headers)
-        response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.find_all("article")
+        def keep(p):
+            return id(p) not in skipped
+
+    else:
+        excluded_ids = {id(element) for element in excluded}
+
+        def keep(p):
+            return not any(id(parent) in excluded_ids for parent in p.parents)
 
-        articles_processed = 0
-        articles_added = 0
+    article_text = []
+    for p in content.select(source.paragraph_selector):
+        if keep(p):
+            text = p.get_text().strip()
+            if text:
+                article_text.append(text)
 
-        for article in articles:
+    # Join paragraphs with single line breaks
+    return "\n".join(article_text)
+
+
+def download(session, url, cache=None):
+    """GET a page, going through the conditional-GET cache when one is given.
+
+    Returns a tuple (body, not_modified).
+    """
+    if cache is not None:
+        return cache.get(session, url)
+    response = session.get(url)
+    response.raise_for_status()
+    return response.text, False
+
+
+def fetch_article(session, link, limiter=None, cache=None, source=INSIDE_PARADEPLATZ):
+    """Download and extract a single article page"""
+    if limiter is None:
+        body, _ = download(session, link, cache)
+    else:
+        with limiter.limit(link):
+            body, _ = download(session, link, cache)
+    return extract_article_content(body, source)
+
+
+def fetch_articles(
+    session,
+    links,
+    max_workers=8,
+    per_host_limit=4,
+    cache=None,
+    source=INSIDE_PARADEPLATZ,
+):
+    """Fetch article pages concurrently.
+
+    Returns the extracted contents in the order of `links`. Articles that
+    could not be fetched are returned as None.
+    """
+    results = [None] * len(links)
+    if not links:
+        return results
+
+    limiter = HostLimiter(per_host_limit)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(fetch_article, session, link, limiter, cache, source): i
+            for i, link in enumerate(links)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
             try:
-                # Extract date
-                date_elem = article.find("time")
-                if not date_elem:
-                    continue
+                results[i] = future.result()
+            except Exception as e:
+                print(f"Error fetching article: {links[i]} - {str(e)}")
+    return results
+
+
+def parse_listing(html, source=INSIDE_PARADEPLATZ, current_date=None, fast=True):
+    """Extract the recent article entries from a listing page, in page order.
 
+    In `fast` mode only the article elements are parsed (with lxml when
+    available); otherwise the whole document is parsed with html.parser.
+    """
+    tz = pytz.timezone(source.timezone)
+    current_date = current_date or datetime.now(tz)
+    strainer = _strainer(source.article_selector) if fast else None
+    if strainer is not None:
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=strainer)
+    else:
+        soup = BeautifulSoup(html, HTML_PARSER if fast else "html.parser")
+    entries = []
+
+    for article in soup.select(source.article_selector):
+        try:
+            # Extract date
+            date_elem = article.select_one(source.date_selector)
+            if not date_elem:
+                continue
+
+            if source.date_attribute:
+                date_str = date_elem[source.date_attribute].strip()
+            else:
                 date_str = date_elem.text.strip()
-                article_date = datetime.strptime(date_str, "%d.%m.%Y").replace(
-                    tzinfo=zurich_tz
-                )
-
-                # Check if article is from last 2 days
-                if current_date - article_date <= timedelta(days=2):
-                    articles_processed += 1
-
-                    # Extract title and link
-                    title_elem = article.find("h2")
-                    title = title_elem.text.strip()
-                    link = title_elem.find("a")["href"]
-
-                    # Extract author (if available)
-                    author = article.find("span", class_="author")
-                    author_text = author.text.strip() if author else ""
-
-                    # Create unique hash for article
-                    article_hash = hashlib.md5(
-                        f"{date_str}{title}{link}".encode()
-                    ).hexdigest()
-
-                    # Check if article already exists
-                    cursor.execute(
-                        "SELECT id FROM articles WHERE article_hash = ?",
-                        (article_hash,),
-                    )
-                    if cursor.fetchone():
-                        print(f"Article already exists: {title}")
-                        continue
-
-                    # Fetch article content
-                    try:
-                        article_response = requests.get(link, headers=headers)
-                        article_response.raise_for_status()
-                        article_soup = BeautifulSoup(
-                            article_response.text, "html.parser"
-                        )
-
-                        # Find the main content div
-                        content = article_soup.find("div", class_="entry-content")
-                        if content:
-                            article_text = []
-                            paragraphs = content.find_all("p")
-
-                            for p in paragraphs:
-                                if not p.find_parent(
-                                    class_=["wp-caption", "social-media"]
-                                ):
-                                    text = p.get_text().strip()
-                                    if text:
-                                        article_text.append(text)
-
-                            # Join paragraphs with single line breaks
-                            full_content = "\n".join(article_text)
-
-                            # Store in database
-                            cursor.execute(
-                                """
-                                INSERT INTO articles (article_hash, date, title, author, link, content)
-                                VALUES (?, ?, ?, ?, ?, ?)
-                            """,
-                                (
-                                    article_hash,
-                                    date_str,
-                                    title,
-                                    author_text,
-                                    link,
-                                    full_content,
-                                ),
-                            )
-
-                            conn.commit()
-                            articles_added += 1
-                            print(f"Article saved: {title}")
-
-                    except Exception as e:
-                        print(f"Error fetching article: {title} - {str(e)}")
+            article_date = datetime.strptime(date_str, source.date_format)
+            if article_date.tzinfo is None:
+                article_date = article_date.replace(tzinfo=tz)
 
-            except Exception as e:
-                print(f"Error processing article: {str(e)}")
+            # Check if article is recent enough
+            if current_date - article_date > timedelta(days=source.max_age_days):
                 continue
 
-    except requests.RequestException as e:
-        print(f"Error fetching the website: {e}")
+            # Extract title and link
+            title_elem = article.select_one(source.title_selector)
+            title = title_elem.text.strip()
+            link_elem = title_elem if title_elem.name == "a" else title_elem.find("a")
+            link = urljoin(source.listing_url, link_elem["href"])
+
+            # Extract author (if available)
+            author = article.select_one(source.author_selector)
+            author_text = author.text.strip() if author else ""
+
+            # Create unique hash for article
+            article_hash = hashlib.md5(f"{date_str}{title}{link}".encode()).hexdigest()
+
+            entries.append(
+                {
+                    "article_hash": article_hash,
+                    "date": date_str,
+                    "published_at": article_date.strftime("%Y-%m-%d"),
+                    "title": title,
+                    "author": author_text,
+                    "link": link,
+                }
+            )
+        except Exception as e:
+            print(f"Error processing article on {source.name}: {str(e)}")
+            continue
+
+    return entries
+
+
+def select_new_entries(entries, source, stop_at_known=None):
+    """Drop listing entries that are already stored.
+
+    With `stop_at_known` (default: `source.stop_at_known`) new articles are
+    only taken up to the first known article, since everything after it
+    has been crawled before. Articles whose download failed in an earlier
+    run are retried wherever they are on the listing.
+    """
+    if stop_at_known is None:
+        stop_at_known = source.stop_at_known
+    hashes = [entry["article_hash"] for entry in entries]
+    existing = storage.find_existing_hashes(hashes)
+    failed = storage.find_failed_hashes(hashes)
+    new_entries = []
+    seen = set(existing)
+    stopped = False
+    for entry in entries:
+        if entry["article_hash"] in existing:
+            if stop_at_known and not stopped:
+                print(f"[{source.name}] Reached known article: {entry['title']}")
+                stopped = True
+            elif not stop_at_known:
+                print(f"Article already exists: {entry['title']}")
+            continue
+        if entry["article_hash"] in seen:
+            continue
+        if stopped and entry["article_hash"] not in failed:
+            continue
+        seen.add(entry["article_hash"])
+        new_entries.append(entry)
+    return new_entries
+
+
+def crawl_source(session, source, limiter, article_pool, cache=None):
+    """Crawl one source and return (entries_processed, rows to store).
+
+    Article pages are fetched by the shared `article_pool`, but the host's
+    concurrency cap and request rate are waited for here, in the source's
+    own thread, before a page is submitted. A worker therefore never sits
+    idle on a host limit, and a slow or rate-limited site cannot take
+    workers away from the other sources.
+    """
+    with limiter.limit(source.listing_url):
+        listing, not_modified = download(session, source.listing_url, cache)
+
+    entries = parse_listing(listing, source)
+    if not_modified:
+        # Nothing was published, but articles that failed last time are
+        # still on the listing and anywhere below the stored ones
+        new_entries = select_new_entries(entries, source, stop_at_known=False)
+        if not new_entries:
+            print(f"[{source.name}] Listing page not modified since last run")
+            return 0, []
+        print(
+            f"[{source.name}] Listing page not modified, retrying "
+            f"{len(new_entries)} articles that are not stored yet"
+        )
+    else:
+        new_entries = select_new_entries(entries, source)
+
+    futures = []
+    for entry in new_entries:
+        link = entry["link"]
+        limiter.acquire(link)
+        try:
+            future = article_pool.submit(
+                fetch_article, session, link, None, cache, source
+            )
+        except Exception:
+            limiter.release(link)
+            raise
+        future.add_done_callback(lambda _, link=link: limiter.release(link))
+        futures.append(future)
+
+    rows = []
+    failures = []
+    for entry, future in zip(new_entries, futures):
+        try:
+            full_content = future.result()
+        except Exception as e:
+            print(f"Error fetching article: {entry['title']} - {str(e)}")
+            failures.append((entry["article_hash"], entry["link"], str(e)))
+            continue
+        if full_content is None:
+            failures.append((entry["article_hash"], entry["link"], "no content"))
+            continue
+        rows.append(
+            (
+                entry["article_hash"],
+                entry["date"],
+                entry["published_at"],
+                entry["title"],
+                entry["author"],
+                entry["link"],
+                full_content,
+            )
+        )
+    # Retried by later crawls even once newer articles are stored above them
+    storage.record_failed_articles(failures)
+    return len(entries), rows
+
+
+def crawl_sources(sources, max_workers=8, per_host_limit=4, cache=None):
+    """Crawl several sources at once and store their new articles.
+
+    Sources are crawled in parallel and share one pool of `max_workers`
+    article fetchers. Each domain is held to its source's concurrency cap
+    and request rate. A source's articles are stored as soon as that source
+    is done. Returns (articles_processed, articles_added).
+    """
+    session = create_session(pool_size=max_workers)
+    limiter = HostLimiter(per_host_limit)
+    for source in sources:
+        limiter.configure(
+            source.domain,
+            min(source.max_concurrency, per_host_limit),
+            source.requests_per_second,
+        )
+
+    articles_processed = 0
+    articles_added = 0
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(len(sources), max_workers))
+        ) as source_pool, ThreadPoolExecutor(
+            max_workers=max(1, max_workers)
+        ) as article_pool:
+            futures = {
+                source_pool.submit(
+                    crawl_source, session, source, limiter, article_pool, cache
+                ): source
+                for source in sources
+            }
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    processed, rows = future.result()
+                except requests.RequestException as e:
+                    print(f"[{source.name}] Error fetching the website: {e}")
+                    continue
+                except Exception as e:
+                    print(f"[{source.name}] An error occurred: {e}")
+                    continue
+
+                added = storage.store_articles(rows)
+                articles_processed += processed
+                articles_added += added
+                print(f"[{source.name}] {processed} recent articles, {added} new")
+    finally:
+        session.close()
+
+    return articles_processed, articles_added
+
+
+def get_recent_articles(
+    concurrent=True, max_workers=8, per_host_limit=4, cache=None, sources=None
+):
+    """Fetch new articles from the configured sources and store them in the database.
+
+    With `concurrent` sources and article pages are downloaded by a bounded
+    worker pool over one keep-alive session; otherwise they are fetched one
+    by one. When an `HttpCache` is given, pages are fetched with conditional
+    requests; an unchanged listing page is served from the cache and only
+    checked for articles that failed to download before.
+    """
+    sources = sources or [INSIDE_PARADEPLATZ]
+    workers = max_workers if concurrent else 1
+
+    articles_processed = 0
+    articles_added = 0
+    start = time.perf_counter()
+    try:
+        articles_processed, articles_added = crawl_sources(
+            sources, max_workers=workers, per_host_limit=per_host_limit, cache=cache
+        )
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
-        print(f"\nProcessed {articles_processed} articles")
+        elapsed = time.perf_counter() - start
+        mode = f"{workers} workers" if concurrent else "sequential"
+        print(f"\nCrawled {len(sources)} sources in {elapsed:.2f}s ({mode})")
+        print(f"Processed {articles_processed} articles")
         print(f"Added {articles_added} new articles to database")
-        conn.close()
+        if cache is not None:
+            cache.report()
+
+
+def benchmark_crawl(max_workers=8, per_host_limit=4, source=INSIDE_PARADEPLATZ):
+    """Compare crawl wall time of the sequential and the concurrent fetch mode.
+
+    Fetches every recent article on the listing page (ignoring the database)
+    once per mode and prints the timings.
+    """
+    session = create_session(pool_size=max_workers)
+    try:
+        response = session.get(source.listing_url)
+        response.raise_for_status()
+        entries = parse_listing(response.text, source)
+        links = [entry["link"] for entry in entries]
+
+        start = time.perf_counter()
+        sequential = fetch_articles(session, links, max_workers=1, source=source)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = fetch_articles(
+            session,
+            links,
+            max_workers=max_workers,
+            per_host_limit=per_host_limit,
+            source=source,
+        )
+        concurrent_time = time.perf_counter() - start
+    finally:
+        session.close()
+
+    speedup = sequential_time / concurrent_time if concurrent_time else 0.0
+    print(f"\n=== Crawl Benchmark ({len(links)} articles) ===")
+    print(f"Sequential: {sequential_time:.2f}s")
+    print(
+        f"Concurrent ({max_workers} workers, {per_host_limit} per host): {concurrent_time:.2f}s"
+    )
+    print(f"Speedup: {speedup:.1f}x")
+    if sequential != concurrent:
+        print("Warning: concurrent results differ from sequential results")
+
+    return {
+        "articles": len(links),
+        "sequential_seconds": sequential_time,
+        "concurrent_seconds": concurrent_time,
+        "speedup": speedup,
+    }
+
+
+def benchmark_parsing(fixture_dir="fixtures", source=INSIDE_PARADEPLATZ, repeat=20):
+    """Time original (`fast=False`) and fast parsing and compare the output.
+
+    Every .html file in `fixture_dir` is parsed `repeat` times in both
+    modes; files whose name contains "listing" are treated as listing
+    pages, all others as article pages.
+    """
+    pages = sorted(
+        os.path.join(fixture_dir, name)
+        for name in os.listdir(fixture_dir)
+        if name.endswith(".html")
+    )
+    if not pages:
+        print(f"No .html fixtures found in {fixture_dir}")
+        return None
+
+    # Saved listings are old, keep all of their entries
+    source = replace(source, max_age_days=36500)
+
+    timings = {"full": 0.0, "fast": 0.0}
+    mismatches = []
+    for path in pages:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        is_listing = "listing" in os.path.basename(path)
+
+        def parse(fast):
+            if is_listing:
+                return parse_listing(html, source, fast=fast)
+            return extract_article_content(html, source, fast=fast)
+
+        outputs = {}
+        for mode in ("full", "fast"):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                outputs[mode] = parse(mode == "fast")
+            timings[mode] += time.perf_counter() - start
+        if outputs["full"] != outputs["fast"]:
+            mismatches.append(path)
+
+    speedup = timings["full"] / timings["fast"] if timings["fast"] else 0.0
+    print(f"\n=== Parsing Benchmark ({len(pages)} pages x {repeat}) ===")
+    print(f"Baseline (html.parser): {timings['full'] * 1000 / repeat:.1f} ms/pass")
+    print(
+        f"Fast ({HTML_PARSER}, strained): {timings['fast'] * 1000 / repeat:.1f} ms/pass"
+    )
+    print(f"Speedup: {speedup:.1f}x")
+    if mismatches:
+        print(f"Output differs for: {', '.join(mismatches)}")
+    else:
+        print("Extracted output is identical")
+
+    return {
+        "pages": len(pages),
+        "full_seconds": timings["full"],
+        "fast_seconds": timings["fast"],
+        "speedup": speedup,
+        "mismatches": mismatches,
+    }
 
 
 def get_stored_articles(days=7):
     """Retrieve articles from the database"""
-    conn = sqlite3.connect("inside_paradeplatz.db")
-    cursor = conn.cursor()
-
-    # Calculate date threshold
-    date_threshold = (datetime.now() - timedelta(days=days)).strftime("%d.%m.%Y")
-
-    cursor.execute(
-        """
-        SELECT date, title, author, link, content 
-        FROM articles 
-        WHERE date >= ? 
-        ORDER BY date DESC
-    """,
-        (date_threshold,),
+    return storage.get_articles_since(days)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config_parser import load_config, get_scraper
+
+    parser = argparse.ArgumentParser(description="Fetch recent articles")
+    parser.add_argument(
+        "--sequential", action="store_true", help="Fetch article pages one by one"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Worker pool size")
+    parser.add_argument(
+        "--per-host", type=int, default=4, help="Concurrent requests per host"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the conditional-GET cache"
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare sequential and concurrent crawl wall time",
     )
+    parser.add_argument(
+        "--benchmark-parsing",
+        metavar="FIXTURE_DIR",
+        nargs="?",
+        const="fixtures",
+        help="Compare full and fast parsing over saved .html pages",
+    )
+    args = parser.parse_args()
 
-    articles = cursor.fetchall()
-    conn.close()
-    return articles
+    sources = load_sources(get_scraper(load_config()))
+    if args.benchmark_parsing:
+        benchmark_parsing(args.benchmark_parsing, source=sources[0])
+    elif args.benchmark:
+        benchmark_crawl(
+            max_workers=args.workers, per_host_limit=args.per_host, source=sources[0]
+        )
+    else:
+        cache = None if args.no_cache else HttpCache()
+        get_recent_articles(
+            concurrent=not args.sequential,
+            max_workers=args.workers,
+            per_host_limit=args.per_host,
+            cache=cache,
+            sources=sources,
+        )
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class HttpCache:
+    """On-disk HTTP cache using ETag/Last-Modified validators.
+
+    Response bodies are stored in a SQLite file together with their
+    validators. Subsequent requests for the same URL are sent as conditional
+    requests, and a 304 response is served from the stored body. When the
+    stored bodies exceed `max_bytes` the least recently used entries are
+    evicted.
+    """
+
+    def __init__(
+        self, path=os.path.join("data", "http_cache.db"), max_bytes=50_000_000
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body TEXT,
+                size INTEGER,
+                last_access REAL
+            )
+        """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)"
+        )
+        self.conn.commit()
+
+    def get(self, session, url):
+        """Fetch `url` with a conditional request.
+
+        Returns a tuple (body, not_modified). `not_modified` is True when the
+        server answered 304 and the body comes from the cache.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+        headers = {}
+        if row:
+            etag, last_modified, _ = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = session.get(url, headers=headers)
+
+        if response.status_code == 304 and row:
+            with self._lock:
+                self.hits += 1
+                self.conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE url = ?",
+                    (time.time(), url),
+                )
+                self.conn.commit()
+            return row[2], True
+
+        response.raise_for_status()
+        body = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        with self._lock:
+            self.misses += 1
+            if etag or last_modified:
+                self.conn.execute(
+                    """
+                    INSERT OR REPLACE INTO responses (url, etag, last_modified, body, size, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        url,
+                        etag,
+                        last_modified,
+                        body,
+                        len(body.encode("utf-8")),
+                        time.time(),
+                    ),
+                )
+                self._evict()
+                self.conn.commit()
+
+        return body, False
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits `max_bytes`"""
+        total = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self.conn.execute(
+            "SELECT url, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((url,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"HTTP cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate)"
+        )
+
+    def close(self):
+        self.conn.close()
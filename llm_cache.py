@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from config_parser import get_llm_cache
+from rate_limiter import scheduled_call
+from telemetry import record_call
+
+
+class CompletionCache:
+    """Local store of chat-completion results keyed by their request.
+
+    The key is a hash of model, messages, temperature and max_tokens, so a
+    rerun with identical prompts reuses earlier results. Entries expire
+    after `ttl_seconds`; beyond `max_entries` the least recently used ones
+    are evicted. Hits and misses are counted per pipeline stage.
+    """
+
+    def __init__(
+        self,
+        path=os.path.join("data", "llm_cache.db"),
+        ttl_seconds=7 * 24 * 3600,
+        max_entries=5000,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                stage TEXT,
+                model TEXT,
+                content TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+        """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions (last_access)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature=None, max_tokens=None):
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, stage):
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses[stage] += 1
+                return None
+            self.hits[stage] += 1
+            self.conn.execute(
+                "UPDATE completions SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, stage, model, content):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO completions (key, stage, model, content, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (key, stage, model, content, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        count = self.conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY last_access ASC LIMIT ?
+                )
+            """,
+                (count - self.max_entries,),
+            )
+
+    def report(self):
+        stages = sorted(set(self.hits) | set(self.misses))
+        if not stages:
+            return
+        print("\n=== Completion Cache ===")
+        for stage in stages:
+            hits, misses = self.hits[stage], self.misses[stage]
+            print(
+                f"{stage}: {hits} hits, {misses} misses "
+                f"({hits / (hits + misses):.0%} hit rate)"
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_enabled = None
+
+
+def set_cache_enabled(enabled):
+    """Force the cache on or off for this process (e.g. for fresh generations)"""
+    global _enabled
+    _enabled = enabled
+
+
+def get_cache(config):
+    """Return the process-wide completion cache, or None when it is disabled"""
+    global _cache
+    settings = get_llm_cache(config)
+    enabled = settings.get("enabled", True) if _enabled is None else _enabled
+    if not enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache(
+                path=settings.get("path", os.path.join("data", "llm_cache.db")),
+                ttl_seconds=settings.get("ttl_hours", 168) * 3600,
+                max_entries=settings.get("max_entries", 5000),
+            )
+    return _cache
+
+
+def report_cache_stats():
+    if _cache is not None:
+        _cache.report()
+
+
+def create_completion(
+    client, stage, config, model, messages, temperature=None, max_tokens=None, **kwargs
+):
+    """Run a chat completion through the cache and return the message text.
+
+    Extra keyword arguments (e.g. `timeout`) are passed to the API but are
+    not part of the cache key.
+    """
+    started = time.perf_counter()
+    cache = get_cache(config)
+    key = None
+    if cache is not None:
+        key = CompletionCache.make_key(model, messages, temperature, max_tokens)
+        content = cache.get(key, stage)
+        if content is not None:
+            record_call(
+                config, stage, model, time.perf_counter() - started, cached=True
+            )
+            return content
+
+    params = {"model": model, "messages": messages}
+    if temperature is not None:
+        params["temperature"] = temperature
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    try:
+        raw, retries = scheduled_call(
+            config,
+            stage,
+            model,
+            messages,
+            max_tokens,
+            lambda: client.chat.completions.with_raw_response.create(
+                **params, **kwargs
+            ),
+        )
+        response = raw.parse()
+    except Exception as e:
+        record_call(config, stage, model, time.perf_counter() - started, error=str(e))
+        raise
+    content = response.choices[0].message.content
+    record_call(
+        config,
+        stage,
+        model,
+        time.perf_counter() - started,
+        usage=response.usage,
+        retries=retries + getattr(raw, "retries_taken", 0),
+    )
+
+    if cache is not None and content is not None:
+        cache.put(key, stage, model, content)
+    return content
+
+
+def stream_completion(
+    client, stage, config, model, messages, temperature=None, max_tokens=None, **kwargs
+):
+    """Like `create_completion`, but yield the text as it is generated.
+
+    A cached result is yielded in one piece; a fresh one is stored once the
+    stream has finished.
+    """
+    started = time.perf_counter()
+    cache = get_cache(config)
+    key = None
+    if cache is not None:
+        key = CompletionCache.make_key(model, messages, temperature, max_tokens)
+        content = cache.get(key, stage)
+        if content is not None:
+            record_call(
+                config, stage, model, time.perf_counter() - started, cached=True
+            )
+            yield content
+            return
+
+    params = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    if temperature is not None:
+        params["temperature"] = temperature
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    parts = []
+    usage = None
+    try:
+        raw, retries = scheduled_call(
+            config,
+            stage,
+            model,
+            messages,
+            max_tokens,
+            lambda: client.chat.completions.with_raw_response.create(
+                **params, **kwargs
+            ),
+        )
+        for event in raw.parse():
+            # With include_usage the last event carries the usage and no choices
+            usage = getattr(event, "usage", None) or usage
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        record_call(config, stage, model, time.perf_counter() - started, error=str(e))
+        raise
+    record_call(
+        config,
+        stage,
+        model,
+        time.perf_counter() - started,
+        usage=usage,
+        retries=retries + getattr(raw, "retries_taken", 0),
+    )
+
+    if cache is not None and parts:
+        cache.put(key, stage, model, "".join(parts))
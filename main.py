@@ -1,4 +1,7 @@
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 import argparse
@@ -11,15 +14,24 @@ from config_parser import (
     get_prompts,
     get_screenwriter,
     get_directories,
+    get_scraper,
 )
 
 from get_information import get_recent_articles
-from create_post import create_linkedin_post, get_latest_articles
-from create_dialogue import create_dialogue
-from create_audio import main as create_audio
+from http_cache import HttpCache
+from llm_cache import report_cache_stats, set_cache_enabled
+from audio_cache import report_audio_cache_stats, set_audio_cache_enabled
+from openai_client import get_client
+from telemetry import report_run, set_run_id
+from sources import load_sources
+from create_post import create_linkedin_post
+from storage import get_latest_articles, search_articles
+import storage
+from create_dialogue import create_dialogue, stream_dialogue
+from create_audio import main as create_audio, parse_script, synthesize_lines
+from run_manifest import RunManifest, manifest_path
 from create_episode import (
-    load_audio,
-    stitch_audio,
+    stitch_clips,
     apply_postprocessing,
     add_intro_outro,
     save_audio,
@@ -31,10 +43,36 @@ def generate_run_id():
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
-def process_articles(run_id=None, config=None):
-    """Fetch articles and create a LinkedIn post"""
-    get_recent_articles()
-    articles = get_latest_articles()
+def process_articles(run_id=None, config=None, query=None, days=None):
+    """Fetch articles and create a LinkedIn post.
+
+    Without a `query` the latest articles are used; otherwise all articles
+    matching the full-text query (optionally within the last `days`).
+    """
+    scraper = get_scraper(config) if config else {}
+    cache_config = scraper.get("http_cache", {})
+    cache = None
+    if cache_config.get("enabled", False):
+        cache = HttpCache(
+            path=cache_config.get("path", os.path.join("data", "http_cache.db")),
+            max_bytes=cache_config.get("max_bytes", 50_000_000),
+        )
+    try:
+        get_recent_articles(
+            concurrent=scraper.get("concurrent", True),
+            max_workers=scraper.get("max_workers", 8),
+            per_host_limit=scraper.get("per_host_limit", 4),
+            cache=cache,
+            sources=load_sources(scraper),
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    if query:
+        articles = search_articles(query, days=days)
+        print(f"Found {len(articles)} articles matching: {query}")
+    else:
+        articles = get_latest_articles()
     if not articles:
         return None, "No articles found"
 
@@ -53,15 +91,81 @@ def process_text_file(input_text_file):
         return file.read()
 
 
-def run_pipeline(input_text_file=None, config_path=None):
-    """Run the complete content generation pipeline"""
+def stream_script_to_audio(content, run_id, config):
+    """Write the script and voice it at the same time.
+
+    The screenwriter output is streamed on a background thread; every line
+    it completes is queued and voiced right away, in script order.
+    """
+    started_at = time.perf_counter()
+    lines = queue.Queue()
+    errors = []
+    scripts = []
+
+    def write_script():
+        try:
+            script = stream_dialogue(
+                main_content=content,
+                on_line=lines.put,
+                output_file=f"podcast_script_{run_id}.txt",
+                config=config,
+            )
+            scripts.append(script)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            lines.put(None)
+
+    writer = threading.Thread(target=write_script, daemon=True)
+    writer.start()
+
+    client = get_client(config, "podcast_audio")
+    audio_dir = get_directories(config).get("audio", "data/audio")
+    # The script is new, so nothing recorded for this run before still applies
+    manifest = RunManifest(manifest_path(audio_dir, f"audio_{run_id}"))
+    manifest.reset()
+    clips = synthesize_lines(
+        client,
+        iter(lines.get, None),
+        os.path.join(audio_dir, f"audio_{run_id}"),
+        config,
+        started_at=started_at,
+        manifest=manifest,
+    )
+    writer.join()
+    if errors:
+        raise errors[0]
+    # The line count is only known once the script is complete
+    manifest.set_script(scripts[0], total=len(parse_script(scripts[0])), streamed=True)
+
+    print(f"Script and audio done in {time.perf_counter() - started_at:.1f}s")
+    return clips
+
+
+def run_pipeline(
+    input_text_file=None,
+    config_path=None,
+    query=None,
+    days=None,
+    stream=False,
+    resume=None,
+):
+    """Run the complete content generation pipeline.
+
+    With `resume`, an earlier run is continued: if its script was written,
+    only the audio lines its manifest does not record as done are generated.
+    """
     try:
-        run_id = generate_run_id()
-        print(f"\n=== Starting Pipeline Run: {run_id} ===")
+        run_id = resume or generate_run_id()
+        set_run_id(run_id)
+        print(
+            f"\n=== {'Resuming' if resume else 'Starting'} Pipeline Run: {run_id} ==="
+        )
 
         # Load configuration
         print(f"Loading config from: {config_path or 'based_config.json'}")
         config = load_config(config_path)
+        storage.configure(config)
         directories = get_directories(config)
 
         # Create directories from config
@@ -69,38 +173,64 @@ def run_pipeline(input_text_file=None, config_path=None):
             if dir_path:  # Only create if path is not None/empty
                 os.makedirs(dir_path, exist_ok=True)
 
+        script_file = f"podcast_script_{run_id}.txt"
+        if resume and os.path.exists(os.path.join(directories["scripts"], script_file)):
+            print(f"Reusing {script_file}")
+            content = None
         # Determine content source
-        if input_text_file:
+        elif input_text_file:
             content = process_text_file(input_text_file)
             print(f"\n=== Content: {content[:100]} ===")
         else:
-            content, error = process_articles(run_id, config=config)
+            content, error = process_articles(
+                run_id, config=config, query=query, days=days
+            )
             if error:
                 return error
 
-        # Step 2: Create podcast script
-        create_dialogue(
-            main_content=content,
-            output_file=f"podcast_script_{run_id}.txt",
-            config=config,  # Pass the whole config
-        )
-        print("podcast_script_done")
-
-        # Step 3: Generate audio files
-        print(f"\n=== Generating Audio Files ===")
-        audio_files = create_audio(
-            script_path=f"podcast_script_{run_id}.txt",
-            output_prefix=f"audio_{run_id}",
-            run_id=run_id,
-            config=config,  # Pass the whole config
-        )
-        if not audio_files:
+        if content is None:
+            print(f"\n=== Generating Missing Audio Files ===")
+            clips = create_audio(
+                script_path=script_file,
+                output_prefix=f"audio_{run_id}",
+                run_id=run_id,
+                config=config,
+            )
+        elif stream:
+            # Steps 2 and 3 overlap: lines are voiced while the script is written
+            print(f"\n=== Streaming Script to Audio ===")
+            clips = stream_script_to_audio(content, run_id, config)
+        else:
+            # Step 2: Create podcast script
+            create_dialogue(
+                main_content=content,
+                output_file=script_file,
+                config=config,  # Pass the whole config
+            )
+            print("podcast_script_done")
+
+            # Step 3: Generate audio files
+            print(f"\n=== Generating Audio Files ===")
+            clips = create_audio(
+                script_path=script_file,
+                output_prefix=f"audio_{run_id}",
+                run_id=run_id,
+                config=config,  # Pass the whole config
+            )
+        manifest = RunManifest(manifest_path(directories["audio"], f"audio_{run_id}"))
+        missing = manifest.missing_lines()
+        if missing:
+            # An episode with holes is worse than none; keep what exists
+            return (
+                f"{len(missing)} lines have no audio yet (lines "
+                f"{', '.join(map(str, missing))}); rerun with --resume {run_id}"
+            )
+        if not clips:
             return "Failed to generate audio files"
 
         # Step 4: Create final podcast episode
         print(f"\n=== Creating Final Podcast Episode ===")
-        segments = load_audio(run_id=run_id, config=config)
-        combined_audio = stitch_audio(segments)
+        combined_audio = stitch_clips(clips)
         processed_audio = apply_postprocessing(combined_audio)
         final_audio = add_intro_outro(
             processed_audio,
@@ -113,14 +243,14 @@ def run_pipeline(input_text_file=None, config_path=None):
             fade_duration=2000,
         )
         output_filename = f"episode_{run_id}.mp3"
-        save_audio(final_audio, output_filename, run_id=run_id, config=config)
+        save_audio(final_audio, output_filename, run_id=run_id, directories=directories)
         episode_path = os.path.join(directories["episodes"], run_id, output_filename)
 
         return {
             "status": "success",
             "run_id": run_id,
             "curated_post": content,
-            "audio_files": audio_files,
+            "audio_files": [clip.file for clip in clips if clip.file],
             "episode_path": episode_path,
         }
 
@@ -142,9 +272,48 @@ def main():
         type=str,
         help="Path to JSON configuration file. If not provided, uses base config.",
     )
+    parser.add_argument(
+        "--query",
+        type=str,
+        help='Full-text query selecting the articles, e.g. "UBS OR Credit Suisse"',
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        help="Only select articles from the last N days (used with --query).",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Bypass the completion and audio caches and generate everything anew.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Start generating audio while the script is still being written.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue a failed run, generating only the audio it is missing.",
+    )
     args = parser.parse_args()
 
-    result = run_pipeline(args.input_file, args.config_file)
+    if args.fresh:
+        set_cache_enabled(False)
+        set_audio_cache_enabled(False)
+
+    result = run_pipeline(
+        args.input_file,
+        args.config_file,
+        args.query,
+        args.days,
+        args.stream,
+        args.resume,
+    )
+    report_cache_stats()
+    report_audio_cache_stats()
+    report_run()
 
     if isinstance(result, dict):
         print("\n=== Pipeline Completed Successfully ===")
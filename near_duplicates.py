@@ -0,0 +1,58 @@
+import hashlib
+import re
+
+# 64-bit SimHash fingerprints are split into four 16-bit bands. Two
+# fingerprints within a Hamming distance of 3 agree on at least one band,
+# so candidates can be found with indexed equality lookups on the bands
+# instead of comparing against every stored article.
+BITS = 64
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text, size=3):
+    """Return the set of lowercase word n-grams of `text`"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def simhash(text, size=3):
+    """Compute the 64-bit SimHash fingerprint of `text`"""
+    weights = [0] * BITS
+    for shingle in shingles(text, size):
+        h = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(BITS):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def bands(fingerprint):
+    return [(fingerprint >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def to_signed(fingerprint):
+    """Map an unsigned 64-bit fingerprint onto SQLite's signed INTEGER range"""
+    return fingerprint - (1 << BITS) if fingerprint >= 1 << (BITS - 1) else fingerprint
+
+
+def to_unsigned(value):
+    return value + (1 << BITS) if value < 0 else value
@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import threading
+
+from dotenv import load_dotenv
+from openai import OpenAI, DefaultHttpxClient, Timeout
+
+try:
+    import httpx
+except ImportError:  # newer openai releases are built on httpx2
+    import httpx2 as httpx
+
+from config_parser import get_openai_client
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def create_client(config=None):
+    """Create an OpenAI client with the connection pool from the config.
+
+    HTTP/2 is used when requested and the `h2` package is installed;
+    otherwise connections fall back to HTTP/1.1 keep-alive.
+    """
+    load_dotenv()
+    settings = get_openai_client(config) if config else {}
+    pool = settings.get("pool", {})
+    timeouts = settings.get("timeouts", {})
+
+    http2 = settings.get("http2", True) and importlib.util.find_spec("h2") is not None
+    http_client = DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=pool.get("max_connections", 20),
+            max_keepalive_connections=pool.get("max_keepalive_connections", 10),
+            keepalive_expiry=pool.get("keepalive_expiry", 60),
+        ),
+    )
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=settings.get("base_url") or os.getenv("OPENAI_BASE_URL"),
+        max_retries=settings.get("max_retries", 2),
+        timeout=Timeout(
+            timeouts.get("default", 60), connect=timeouts.get("connect", 5)
+        ),
+        http_client=http_client,
+    )
+
+
+def get_client(config=None, stage=None):
+    """Return the process-wide OpenAI client, creating it on first use.
+
+    With a `stage` that has its own entry under `openai_client.timeouts`,
+    a view of the client with that timeout is returned; it shares the same
+    connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client(config)
+
+    timeouts = get_openai_client(config).get("timeouts", {}) if config else {}
+    if stage in timeouts:
+        return _client.with_options(
+            timeout=Timeout(timeouts[stage], connect=timeouts.get("connect", 5))
+        )
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
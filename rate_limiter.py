@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+
+import openai
+
+from config_parser import get_rate_limits
+
+INTERACTIVE = 0
+BACKLOG = 1
+PRIORITIES = {"interactive": INTERACTIVE, "backlog": BACKLOG}
+
+# Stages that can wait behind an episode that someone is waiting for
+DEFAULT_BACKLOG_STAGES = ("content_distillation", "distillation_merge", "briefing")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Seconds of a rate-limit reset value such as "6m0s", "1.5s" or "20ms" """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = _DURATION.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in matches)
+
+
+class ModelLimiter:
+    """Request and token buckets for one model, shared by all threads.
+
+    Both buckets refill continuously at the per-minute limits and hold at
+    most `burst_seconds` worth of capacity, since the API enforces its
+    limits over short windows rather than whole minutes. Waiting
+    callers are served strictly by priority, then in arrival order, so
+    backlog work never takes capacity from an interactive run that is
+    waiting. `pause` stops everyone, e.g. after a 429 with retry-after.
+    """
+
+    def __init__(self, rpm, tpm, burst_seconds=1.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_capacity = max(1.0, rpm * burst_seconds / 60)
+        self.token_capacity = tpm * burst_seconds / 60
+        self.requests = self.request_capacity
+        self.tokens = self.token_capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(
+            self.request_capacity, self.requests + elapsed * self.rpm / 60
+        )
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens, priority=INTERACTIVE):
+        """Block until a request of `tokens` tokens may be sent"""
+        # A request larger than the bucket waits for a full one and leaves
+        # it in debt, which later requests wait out
+        needed = min(tokens, self.token_capacity)
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self.waiting[0] == ticket and now >= self.paused_until:
+                        if self.requests >= 1 and self.tokens >= needed:
+                            self.requests -= 1
+                            self.tokens -= tokens
+                            return
+                        wait = max(
+                            (1 - self.requests) * 60 / self.rpm,
+                            (needed - self.tokens) * 60 / self.tpm,
+                        )
+                    elif self.waiting[0] == ticket:
+                        wait = self.paused_until - now
+                    else:
+                        wait = None
+                    self._cond.wait(timeout=wait)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self._cond.notify_all()
+
+    def update(self, headers):
+        """Align the buckets with the x-ratelimit-* headers of a response"""
+        if headers is None:
+            return
+        with self._cond:
+            self._refill(time.monotonic())
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            if remaining is not None:
+                self.requests = min(self.requests, float(remaining))
+            remaining = headers.get("x-ratelimit-remaining-tokens")
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+    def pause(self, seconds):
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+
+class Scheduler:
+    """Process-wide gate for API calls: per-model limits, priorities, retries"""
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.default_limits = settings.get("default", {"rpm": 500, "tpm": 200_000})
+        self.model_limits = settings.get("models", {})
+        self.max_retries = settings.get("max_retries", 6)
+        self.base_delay = settings.get("base_delay", 1.0)
+        self.max_delay = settings.get("max_delay", 60.0)
+        self.burst_seconds = settings.get("burst_seconds", 1.0)
+        self.stage_priorities = {stage: BACKLOG for stage in DEFAULT_BACKLOG_STAGES}
+        for stage, name in settings.get("priorities", {}).items():
+            self.stage_priorities[stage] = PRIORITIES[name]
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model):
+        with self._lock:
+            if model not in self.limiters:
+                limits = self.model_limits.get(model, self.default_limits)
+                self.limiters[model] = ModelLimiter(
+                    limits["rpm"], limits["tpm"], self.burst_seconds
+                )
+            return self.limiters[model]
+
+    def retry_delay(self, attempt, error):
+        """Exponential backoff with jitter, at least what the server asked for"""
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        delay = random.uniform(delay / 2, delay)
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after_ms = response.headers.get("retry-after-ms")
+            if retry_after_ms:
+                retry_after = float(retry_after_ms) / 1000
+            else:
+                retry_after = parse_duration(response.headers.get("retry-after"))
+            if retry_after:
+                delay = max(delay, retry_after)
+        return delay
+
+    def call(self, stage, model, tokens, request):
+        """Send `request()` once the model's limits allow, retrying on errors.
+
+        `request` must return a raw response (with_raw_response) so the
+        rate-limit headers can be read. Returns the raw response and the
+        number of retries.
+        """
+        limiter = self.limiter(model)
+        priority = self.stage_priorities.get(stage, INTERACTIVE)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire(tokens, priority)
+            try:
+                raw = request()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    # Hold back every caller of this model, not just this one
+                    limiter.pause(delay)
+                print(
+                    f"{stage}: {type(e).__name__}, retrying in {delay:.1f}s "
+                    f"({attempt + 1}/{self.max_retries})"
+                )
+                time.sleep(delay)
+                continue
+            limiter.update(getattr(raw, "headers", None))
+            return raw, attempt
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(config=None):
+    """Return the process-wide scheduler, created from the first config seen"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(get_rate_limits(config) if config else {})
+    return _scheduler
+
+
+def estimate_tokens(model, messages, max_tokens=None):
+    """Tokens a request counts against the TPM limit: prompt plus max output"""
+    from chunking import get_token_counter
+
+    count_tokens = get_token_counter(model)
+    prompt = sum(count_tokens(str(message.get("content", ""))) for message in messages)
+    return prompt + (max_tokens or 0)
+
+
+def scheduled_call(config, stage, model, messages, max_tokens, request):
+    """Run `request` through the process-wide scheduler"""
+    tokens = estimate_tokens(model, messages, max_tokens)
+    return get_scheduler(config).call(stage, model, tokens, request)
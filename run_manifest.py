@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class RunManifest:
+    """Progress of a run's audio stage, saved after every line.
+
+    Records which script lines have audio (and where), which failed and how
+    often they were tried, so `main.py --resume <run_id>` only regenerates
+    what is missing. The manifest is tied to the script it was made for;
+    a different script starts a fresh manifest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.script_hash = None
+        self.total = None
+        self.lines = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.script_hash = data.get("script_hash")
+            self.total = data.get("total")
+            self.lines = data.get("lines", {})
+
+    @staticmethod
+    def hash_script(script):
+        return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+    def set_script(self, script, total=None, streamed=False):
+        """Bind the manifest to `script`, discarding progress for another one.
+
+        Lines recorded without a script belong to one that was still being
+        written; they are only kept with `streamed`, i.e. when `script` is
+        that script, finished. Otherwise it was never completed and its
+        audio does not match `script`.
+        """
+        script_hash = self.hash_script(script)
+        with self._lock:
+            if self.script_hash is None:
+                stale = self.lines and not streamed
+            else:
+                stale = self.script_hash != script_hash
+            if stale:
+                print("Script changed since the last attempt, starting over")
+                self.lines = {}
+            self.script_hash = script_hash
+            if total is not None:
+                self.total = total
+            self._save()
+
+    def reset(self):
+        """Forget all progress, e.g. before voicing a script still being written"""
+        with self._lock:
+            self.script_hash = None
+            self.total = None
+            self.lines = {}
+            self._save()
+
+    def is_done(self, index):
+        """Whether the line was voiced; its part file, if any, must still exist"""
+        entry = self.lines.get(str(index + 1))
+        return (
+            entry is not None
+            and entry["status"] == "done"
+            and (entry["file"] is None or os.path.exists(entry["file"]))
+        )
+
+    def file(self, index):
+        """Part file of a voiced line, or None if it has to be voiced again"""
+        if not self.is_done(index):
+            return None
+        return self.lines[str(index + 1)]["file"]
+
+    def mark_done(self, index, filename, attempts):
+        self._update(index, status="done", file=filename, attempts=attempts)
+
+    def mark_failed(self, index, error, attempts):
+        self._update(index, status="failed", error=error, attempts=attempts)
+
+    def _update(self, index, **entry):
+        with self._lock:
+            self.lines[str(index + 1)] = dict(entry, updated_at=time.time())
+            self._save()
+
+    def missing_lines(self):
+        """Line numbers without audio, or None if the line count is unknown"""
+        if self.total is None:
+            return None
+        return [i + 1 for i in range(self.total) if not self.is_done(i)]
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "script_hash": self.script_hash,
+                    "total": self.total,
+                    "lines": self.lines,
+                },
+                f,
+                indent=2,
+            )
+        os.replace(temp_path, self.path)
+
+
+def manifest_path(audio_dir, output_prefix):
+    return os.path.join(audio_dir, f"{output_prefix}_manifest.json")
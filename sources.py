@@ -0,0 +1,63 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urlparse
+
+
+@dataclass
+class SourceAdapter:
+    """Describes how to scrape one news site.
+
+    Selectors are CSS selectors. Each element matching `article_selector` on
+    the listing page is one entry; the date, title and author are looked up
+    inside it. `title_selector` must match the link to the article or an
+    element containing it. On article pages the text of the
+    `paragraph_selector` elements inside `content_selector` is kept, except
+    for paragraphs nested in one of the `excluded_selectors`.
+    """
+
+    name: str
+    listing_url: str
+    article_selector: str = "article"
+    date_selector: str = "time"
+    date_format: str = "%d.%m.%Y"
+    # Read the date from this attribute (e.g. "datetime") instead of the text
+    date_attribute: Optional[str] = None
+    title_selector: str = "h2"
+    author_selector: str = "span.author"
+    content_selector: str = "div.entry-content"
+    paragraph_selector: str = "p"
+    excluded_selectors: List[str] = field(
+        default_factory=lambda: [".wp-caption", ".social-media"]
+    )
+    timezone: str = "Europe/Zurich"
+    max_age_days: int = 2
+    # Politeness settings for the source's domain
+    max_concurrency: int = 4
+    requests_per_second: Optional[float] = None
+    # Stop reading the listing at the first article that is already stored
+    stop_at_known: bool = True
+
+    @property
+    def domain(self):
+        return urlparse(self.listing_url).netloc
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(**options)
+
+
+INSIDE_PARADEPLATZ = SourceAdapter(
+    name="insideparadeplatz",
+    listing_url="https://insideparadeplatz.ch/",
+)
+
+
+def load_sources(scraper_config=None):
+    """Build the source adapters listed in the scraper config.
+
+    Falls back to Inside Paradeplatz when no sources are configured.
+    """
+    options = (scraper_config or {}).get("sources")
+    if not options:
+        return [INSIDE_PARADEPLATZ]
+    return [SourceAdapter.from_config(source) for source in options]
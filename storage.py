@@ -0,0 +1,680 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import article_compression
+import near_duplicates
+from config_parser import load_config, get_database
+
+DEFAULT_DB_PATH = os.path.join("data", "content.db")
+
+_local = threading.local()
+_lock = threading.Lock()
+_db_path = None
+_settings = {}
+_migrated = set()
+_dictionaries = {}
+
+
+def configure(config=None):
+    """Set the database path and tuning options from the config.
+
+    Without an explicit config the default `based_config.json` is used the
+    first time a connection is requested.
+    """
+    global _db_path, _settings
+    if config is None:
+        config = load_config()
+    database = get_database(config)
+    with _lock:
+        _db_path = database.get("path", DEFAULT_DB_PATH)
+        _settings = database
+
+
+def get_db_path():
+    if _db_path is None:
+        configure()
+    return _db_path
+
+
+def _apply_pragmas(conn):
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(_settings.get('busy_timeout_ms', 5000))}")
+    conn.execute(f"PRAGMA cache_size = -{int(_settings.get('cache_size_kb', 16000))}")
+    conn.execute(f"PRAGMA mmap_size = {int(_settings.get('mmap_size', 268435456))}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def get_connection():
+    """Return this thread's connection to the content database.
+
+    Connections are opened once per thread and reused, so the sqlite3
+    statement cache keeps the prepared statements below across calls. The
+    schema is created and migrated on the first connection of the process.
+    """
+    path = os.path.abspath(get_db_path())
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            path,
+            timeout=_settings.get("busy_timeout_ms", 5000) / 1000,
+            cached_statements=256,
+        )
+        _apply_pragmas(conn)
+        # Used by the full-text index triggers to index compressed bodies
+        conn.create_function("decompress", 1, decode_content, deterministic=True)
+        with _lock:
+            if path not in _migrated:
+                create_schema(conn)
+                migrate_database(conn)
+                _migrated.add(path)
+            _load_dictionaries(conn)
+        connections[path] = conn
+    return conn
+
+
+def close_connection():
+    """Close the current thread's connections"""
+    connections = getattr(_local, "connections", {})
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def create_schema(conn):
+    """Create the base tables if they don't exist"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_hash TEXT UNIQUE,
+            date TEXT,
+            title TEXT,
+            author TEXT,
+            link TEXT,
+            content TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blog_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_content TEXT,
+            source_articles TEXT, -- Store article IDs used
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    conn.commit()
+
+
+def _add_published_at(conn):
+    """Add an ISO-8601 `published_at` column, backfill it and index it"""
+    conn.execute("ALTER TABLE articles ADD COLUMN published_at TEXT")
+    # Stored dates look like 31.12.2024
+    conn.execute(
+        """
+        UPDATE articles
+        SET published_at = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+        WHERE date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]'
+    """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles (published_at)"
+    )
+
+
+def _add_articles_fts(conn):
+    """Mirror article titles and bodies into an FTS5 index kept in sync by triggers"""
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, content, content='articles', content_rowid='id'
+        )
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO articles_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END
+    """
+    )
+    conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+
+def _add_compression(conn):
+    """Store compression dictionaries and index decompressed bodies.
+
+    Article bodies may now be compressed BLOBs, so the full-text index
+    becomes contentless and is fed the decompressed text by the triggers.
+    The triggers are dropped again by _index_articles_in_python.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS compression_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dictionary BLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS articles_fts_{trigger}")
+    conn.execute("DROP TABLE IF EXISTS articles_fts")
+
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE articles_fts USING fts5(title, content, content='')
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, content)
+            VALUES (new.id, new.title, decompress(new.content));
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, decompress(old.content));
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, decompress(old.content));
+            INSERT INTO articles_fts (rowid, title, content)
+            VALUES (new.id, new.title, decompress(new.content));
+        END
+    """
+    )
+    conn.execute(
+        """
+        INSERT INTO articles_fts (rowid, title, content)
+        SELECT id, title, decompress(content) FROM articles
+    """
+    )
+
+
+def _add_near_duplicates(conn):
+    """Add SimHash fingerprints and a `duplicate_of` flag for republished articles"""
+    conn.execute("ALTER TABLE articles ADD COLUMN duplicate_of INTEGER")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_simhash (
+            article_id INTEGER PRIMARY KEY,
+            simhash INTEGER,
+            band0 INTEGER,
+            band1 INTEGER,
+            band2 INTEGER,
+            band3 INTEGER
+        )
+    """
+    )
+    for band in range(near_duplicates.BANDS):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_article_simhash_band{band} "
+            f"ON article_simhash (band{band})"
+        )
+
+    # Fingerprint the existing archive in insertion order
+    _load_dictionaries(conn)
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, content FROM articles WHERE id > ? ORDER BY id LIMIT 500",
+            (last_id,),
+        ).fetchall()
+        if not rows:
+            break
+        _index_near_duplicates(
+            conn,
+            [(article_id, decode_content(content)) for article_id, content in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _add_article_failures(conn):
+    """Remember articles whose download failed, so later crawls retry them"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS article_failures (
+            article_hash TEXT PRIMARY KEY,
+            link TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 1,
+            failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def _index_articles_in_python(conn):
+    """Drop the full-text triggers; store_articles indexes new rows itself.
+
+    The triggers called `decompress`, a Python function that only exists on
+    connections opened by get_connection, so writing to `articles` from any
+    other connection (the sqlite3 shell, a backup script) failed. Index
+    entries of deleted articles are left behind, which is harmless: ids are
+    never reused and search_articles only returns rows still in `articles`.
+    Titles edited by hand stay searchable under their old text until the
+    index is rebuilt.
+    """
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS articles_fts_{trigger}")
+
+
+# Schema migrations, applied in order. The schema version is kept in
+# PRAGMA user_version; append new migrations to the end of the list.
+MIGRATIONS = [
+    _add_published_at,
+    _add_articles_fts,
+    _add_compression,
+    _add_near_duplicates,
+    _add_article_failures,
+    _index_articles_in_python,
+]
+
+
+def migrate_database(conn):
+    """Bring the database schema up to the latest version"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read inside the write lock in case another process migrated first
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            print(f"Applied database migration {number}: {migration.__name__}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _load_dictionaries(conn):
+    rows = conn.execute("SELECT id, dictionary FROM compression_dicts").fetchall()
+    _dictionaries.update({dict_id: bytes(dictionary) for dict_id, dictionary in rows})
+
+
+def encode_content(text):
+    """Compress an article body for storage, using the newest dictionary"""
+    compression = _settings.get("compression", {})
+    if text is None or not compression.get("enabled", True):
+        return text
+    dict_id = max(_dictionaries) if _dictionaries else 0
+    return article_compression.compress(
+        text,
+        _dictionaries.get(dict_id),
+        dict_id,
+        compression.get("level", 6),
+    )
+
+
+def decode_content(value):
+    """Return the text of a stored article body"""
+    if article_compression.is_compressed(value):
+        dict_id = article_compression.dictionary_id(value)
+        if dict_id and dict_id not in _dictionaries:
+            # Written with a dictionary trained by another process
+            conn = sqlite3.connect(os.path.abspath(get_db_path()))
+            try:
+                _load_dictionaries(conn)
+            finally:
+                conn.close()
+    return article_compression.decompress(value, _dictionaries)
+
+
+def _decode_rows(rows, column):
+    return [
+        row[:column] + (decode_content(row[column]),) + row[column + 1 :]
+        for row in rows
+    ]
+
+
+# Statements are kept as constants so every call hits the statement cache.
+INSERT_ARTICLE = """
+    INSERT INTO articles (article_hash, date, published_at, title, author, link, content)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(article_hash) DO NOTHING
+"""
+
+SELECT_LATEST_ARTICLES = """
+    SELECT id, date, title, content
+    FROM articles
+    WHERE published_at IS NOT NULL AND (? OR duplicate_of IS NULL)
+    ORDER BY published_at DESC, id DESC
+    LIMIT ?
+"""
+
+SELECT_ARTICLES_SINCE = """
+    SELECT date, title, author, link, content
+    FROM articles
+    WHERE published_at >= ? AND (? OR duplicate_of IS NULL)
+    ORDER BY published_at DESC
+"""
+
+SELECT_SIMHASH_CANDIDATES = """
+    SELECT s.article_id, s.simhash, a.duplicate_of
+    FROM article_simhash s
+    JOIN articles a ON a.id = s.article_id
+    WHERE s.band0 = ? OR s.band1 = ? OR s.band2 = ? OR s.band3 = ?
+"""
+
+INSERT_SIMHASH = """
+    INSERT OR REPLACE INTO article_simhash (article_id, simhash, band0, band1, band2, band3)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+SELECT_UNINDEXED = """
+    SELECT id, article_hash FROM articles
+    WHERE article_hash IN ({placeholders})
+    AND id NOT IN (SELECT article_id FROM article_simhash)
+"""
+
+SELECT_UNSEARCHABLE = """
+    SELECT id, article_hash FROM articles
+    WHERE article_hash IN ({placeholders})
+    AND NOT EXISTS (SELECT 1 FROM articles_fts WHERE rowid = articles.id)
+"""
+
+INSERT_ARTICLE_FTS = """
+    INSERT INTO articles_fts (rowid, title, content) VALUES (?, ?, ?)
+"""
+
+UPSERT_FAILURE = """
+    INSERT INTO article_failures (article_hash, link, error)
+    VALUES (?, ?, ?)
+    ON CONFLICT(article_hash) DO UPDATE SET
+        error = excluded.error,
+        attempts = attempts + 1,
+        failed_at = CURRENT_TIMESTAMP
+"""
+
+INSERT_BLOG_POST = """
+    INSERT INTO blog_posts (post_content, source_articles)
+    VALUES (?, ?)
+"""
+
+
+def _find_hashes(table, hashes, batch_size):
+    conn = get_connection()
+    found = set()
+    # Stay below SQLite's limit on bound parameters per statement
+    for i in range(0, len(hashes), batch_size):
+        batch = hashes[i : i + batch_size]
+        placeholders = ",".join("?" * len(batch))
+        cursor = conn.execute(
+            f"SELECT article_hash FROM {table} WHERE article_hash IN ({placeholders})",
+            batch,
+        )
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def find_existing_hashes(hashes, batch_size=500):
+    """Return the subset of `hashes` that is already stored in the articles table"""
+    return _find_hashes("articles", hashes, batch_size)
+
+
+def find_failed_hashes(hashes, batch_size=500):
+    """Return the subset of `hashes` whose download failed and is not stored yet"""
+    return _find_hashes("article_failures", hashes, batch_size)
+
+
+def record_failed_articles(failures):
+    """Remember (article_hash, link, error) of articles that could not be fetched"""
+    if not failures:
+        return
+    conn = get_connection()
+    with conn:
+        conn.executemany(UPSERT_FAILURE, failures)
+
+
+def _index_near_duplicates(conn, articles):
+    """Fingerprint articles and flag those that repeat an earlier article.
+
+    `articles` are (id, text) pairs in insertion order. An article whose
+    fingerprint is within `max_distance` bits of an indexed article gets
+    `duplicate_of` set to the original. Returns the number flagged.
+    """
+    settings = _settings.get("near_duplicates", {})
+    if not settings.get("enabled", True):
+        return 0
+    max_distance = settings.get("max_distance", 3)
+
+    flagged = []
+    for article_id, text in articles:
+        if not text:
+            continue
+        fingerprint = near_duplicates.simhash(text)
+        bands = near_duplicates.bands(fingerprint)
+
+        original = None
+        for candidate_id, candidate_hash, duplicate_of in conn.execute(
+            SELECT_SIMHASH_CANDIDATES, bands
+        ):
+            if candidate_id == article_id:
+                continue
+            distance = near_duplicates.hamming_distance(
+                fingerprint, near_duplicates.to_unsigned(candidate_hash)
+            )
+            if distance <= max_distance:
+                original = duplicate_of or candidate_id
+                break
+
+        conn.execute(
+            INSERT_SIMHASH,
+            (article_id, near_duplicates.to_signed(fingerprint), *bands),
+        )
+        if original is not None:
+            flagged.append((original, article_id))
+
+    conn.executemany("UPDATE articles SET duplicate_of = ? WHERE id = ?", flagged)
+    return len(flagged)
+
+
+def store_articles(rows, batch_size=500):
+    """Insert article rows in a single transaction.
+
+    Rows are (article_hash, date, published_at, title, author, link,
+    content). Rows whose hash is already present (e.g. written by a
+    concurrent crawler in the meantime) are skipped, the inserted rows are
+    added to the full-text index, near-duplicates of stored articles are
+    flagged and earlier failures of the rows are cleared. Returns the
+    number of inserted rows.
+    """
+    if not rows:
+        return 0
+    conn = get_connection()
+    texts = {row[0]: row[6] for row in rows}
+    titles = {row[0]: row[3] for row in rows}
+    encoded = [row[:6] + (encode_content(row[6]),) for row in rows]
+    with conn:
+        cursor = conn.executemany(INSERT_ARTICLE, encoded)
+        inserted = cursor.rowcount
+        conn.executemany(
+            "DELETE FROM article_failures WHERE article_hash = ?",
+            [(row[0],) for row in rows],
+        )
+
+        # Index and fingerprint the rows that were actually inserted, in
+        # insertion order; looked up in batches like find_existing_hashes
+        hashes = list(texts)
+        unsearchable = []
+        new_ids = []
+        for i in range(0, len(hashes), batch_size):
+            batch = hashes[i : i + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            unsearchable.extend(
+                conn.execute(
+                    SELECT_UNSEARCHABLE.format(placeholders=placeholders), batch
+                )
+            )
+            new_ids.extend(
+                conn.execute(SELECT_UNINDEXED.format(placeholders=placeholders), batch)
+            )
+        conn.executemany(
+            INSERT_ARTICLE_FTS,
+            [
+                (article_id, titles[article_hash], texts[article_hash])
+                for article_id, article_hash in unsearchable
+            ],
+        )
+        new_ids.sort()
+        flagged = _index_near_duplicates(
+            conn,
+            [(article_id, texts[article_hash]) for article_id, article_hash in new_ids],
+        )
+    if flagged:
+        print(f"Flagged {flagged} near-duplicate articles")
+    return inserted
+
+
+def get_latest_articles(limit=3, include_duplicates=False):
+    """Return (id, date, title, content) of the most recent articles"""
+    rows = (
+        get_connection()
+        .execute(SELECT_LATEST_ARTICLES, (include_duplicates, limit))
+        .fetchall()
+    )
+    return _decode_rows(rows, 3)
+
+
+def get_articles_since(days, include_duplicates=False):
+    """Return (date, title, author, link, content) of articles from the last `days`"""
+    date_threshold = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = (
+        get_connection()
+        .execute(SELECT_ARTICLES_SINCE, (date_threshold, include_duplicates))
+        .fetchall()
+    )
+    return _decode_rows(rows, 4)
+
+
+def search_articles(query, days=None, limit=None, include_duplicates=False):
+    """Select articles matching an FTS5 query, newest first.
+
+    `query` uses FTS5 syntax, e.g. "UBS OR Credit Suisse". Matching and
+    date filtering happen inside SQLite, so only the selected rows are
+    loaded. Near-duplicates are skipped unless `include_duplicates` is set.
+    """
+    sql = """
+        SELECT id, date, title, content
+        FROM articles
+        WHERE id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)
+    """
+    params = [query]
+    if not include_duplicates:
+        sql += " AND duplicate_of IS NULL"
+    if days is not None:
+        sql += " AND published_at >= ?"
+        params.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"))
+    sql += " ORDER BY published_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    rows = get_connection().execute(sql, params).fetchall()
+    return _decode_rows(rows, 3)
+
+
+def save_blog_post(post_content, article_ids):
+    conn = get_connection()
+    with conn:
+        conn.execute(INSERT_BLOG_POST, (post_content, ",".join(map(str, article_ids))))
+
+
+def get_all_article_bodies(limit=None):
+    """Return the decompressed bodies of stored articles, newest first"""
+    sql = "SELECT content FROM articles ORDER BY id DESC"
+    params = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (limit,)
+    rows = get_connection().execute(sql, params).fetchall()
+    return [decode_content(row[0]) for row in rows if row[0] is not None]
+
+
+def recompress_articles(sample_size=500, batch_size=500):
+    """Train a new dictionary on recent articles and rewrite every stored body.
+
+    Plain TEXT rows from before compression are converted as well. Each
+    batch is committed separately so readers are not blocked for long. The
+    text does not change, so the full-text index stays as it is.
+    """
+    conn = get_connection()
+    sample = get_all_article_bodies(limit=sample_size)
+    if not sample:
+        print("No articles to recompress")
+        return 0
+
+    dictionary = article_compression.train_dictionary(sample)
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO compression_dicts (dictionary) VALUES (?)", (dictionary,)
+        )
+    _dictionaries[cursor.lastrowid] = dictionary
+    print(f"Trained {len(dictionary)} byte dictionary on {len(sample)} articles")
+
+    rewritten = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, content FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        updates = [
+            (encode_content(decode_content(content)), article_id)
+            for article_id, content in rows
+            if content is not None
+        ]
+        with conn:
+            conn.executemany("UPDATE articles SET content = ? WHERE id = ?", updates)
+        rewritten += len(updates)
+        last_id = rows[-1][0]
+
+    print(f"Recompressed {rewritten} articles")
+    return rewritten
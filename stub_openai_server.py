@@ -0,0 +1,250 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with a canned reply over keep-alive HTTP/1.1.
+
+    audio.speech requests get silent PCM, streamed in a few chunks.
+
+    Every new TCP connection and every request is counted, so a client that
+    reuses its pool shows far fewer connections than requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self.send_error(404)
+            return
+        self._send_json(
+            {
+                "connections": self.server.connections,
+                "requests": self.server.requests,
+                "rate_limited": self.server.rate_limited,
+            }
+        )
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            limited = self._over_limit()
+        time.sleep(self.server.latency)
+        if limited:
+            self._send_rate_limited()
+            return
+
+        if self.path.endswith("/audio/speech"):
+            self._send_speech(body.get("input", ""))
+            return
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        prompt_tokens = sum(
+            len(str(message.get("content", "")).split())
+            for message in body.get("messages", [])
+        )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 2,
+            "total_tokens": prompt_tokens + 2,
+        }
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            self._send_stream(body.get("model"), usage if include_usage else None)
+        else:
+            self._send_json(
+                {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "stub reply"},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+    def _over_limit(self):
+        """Allow `rps` requests per one-second window, like an RPM limit"""
+        if not self.server.rps:
+            return False
+        window = int(time.monotonic())
+        if window != self.server.window:
+            self.server.window, self.server.window_requests = window, 0
+        self.server.window_requests += 1
+        if self.server.window_requests > self.server.rps:
+            self.server.rate_limited += 1
+            return True
+        return False
+
+    def _send_rate_limited(self):
+        data = json.dumps(
+            {"error": {"message": "Rate limit reached", "type": "requests"}}
+        ).encode("utf-8")
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("retry-after-ms", "500")
+        self.send_header("x-ratelimit-remaining-requests", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_speech(self, text, chunks=4):
+        """Silent 24 kHz 16-bit PCM, 0.1s per word, sent in `chunks` parts"""
+        data = bytes(2 * 2400 * max(1, len(text.split())))
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/pcm")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        size = -(-len(data) // chunks)
+        for start in range(0, len(data), size):
+            self.wfile.write(data[start : start + size])
+            self.wfile.flush()
+            time.sleep(self.server.latency / chunks)
+
+    def _send_stream(self, model, usage=None):
+        events = [
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word}}],
+            }
+            for word in ("stub ", "reply")
+        ]
+        if usage:
+            events.append(dict(events[-1], choices=[], usage=usage))
+        data = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+        data = (data + "data: [DONE]\n\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(port=0, latency=0.0, rps=None):
+    """Start the stub server on a background thread and return it.
+
+    With `rps`, requests beyond that many per second get a 429.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.latency = latency
+    server.rps = rps
+    server.window = None
+    server.window_requests = 0
+    server.rate_limited = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check_connection_reuse(requests=50, workers=4, latency=0.01):
+    """Send requests through the shared client and count the connections.
+
+    Raises AssertionError unless every request was answered and the pool
+    reused its connections: at most one per worker and fewer than
+    requests.
+    """
+    import os
+
+    from config_parser import load_config
+    from openai_client import close_client, get_client
+
+    server = start_server(latency=latency)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    config = load_config()
+
+    stages = ["podcast_script", "screenwriter", "content_distillation", "briefing"]
+
+    def call(i):
+        client = get_client(config, stages[i % len(stages)])
+        return client.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": str(i)}]
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(call, range(requests)))
+    finally:
+        close_client()
+        server.shutdown()
+
+    print(
+        f"{server.requests} requests over {server.connections} connections "
+        f"({workers} workers, {len(stages)} stages)"
+    )
+    assert server.requests == requests, f"{server.requests} of {requests} answered"
+    assert server.connections <= workers and server.connections < requests, (
+        f"{server.connections} connections for {requests} requests "
+        f"from {workers} workers"
+    )
+    return server.connections, server.requests
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Stub OpenAI server for checking connection reuse"
+    )
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--rps", type=int, help="Answer 429 beyond this many requests per second"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Run requests through openai_client.get_client and report reuse",
+    )
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            check_connection_reuse(args.requests, args.workers, args.latency or 0.01)
+        except AssertionError as e:
+            raise SystemExit(f"Connection reuse check failed: {e}")
+        print("Connection reuse check passed")
+    else:
+        server = start_server(args.port, args.latency, args.rps)
+        print(f"Stub OpenAI server on http://127.0.0.1:{server.server_port}/v1")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from config_parser import get_telemetry
+
+# Prices in USD per million tokens are set per model in telemetry.prices in
+# the config; audio_output applies to the audio part of the completion tokens.
+# Calls to models without a price are recorded without a cost.
+DEFAULT_PRICES = {}
+
+FIELDS = (
+    "run_id",
+    "stage",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "audio_tokens",
+    "audio_seconds",
+    "latency_ms",
+    "retries",
+    "cached",
+    "cost_usd",
+    "error",
+    "created_at",
+)
+
+
+class SqliteSink:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT,
+                stage TEXT,
+                model TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                audio_tokens INTEGER,
+                audio_seconds REAL,
+                latency_ms REAL,
+                retries INTEGER,
+                cached INTEGER,
+                cost_usd REAL,
+                error TEXT,
+                created_at REAL
+            )
+        """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_calls_run_id ON calls (run_id)"
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self.conn.execute(
+                f"INSERT INTO calls ({', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in FIELDS)})",
+                [record[field] for field in FIELDS],
+            )
+            self.conn.commit()
+
+    def records(self, run_id):
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM calls WHERE run_id = ? ORDER BY id",
+                (run_id,),
+            ).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def runs(self):
+        with self._lock:
+            return [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT run_id FROM calls GROUP BY run_id ORDER BY MAX(id)"
+                )
+            ]
+
+
+class JsonlSink:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def records(self, run_id):
+        return [record for record in self._read() if record["run_id"] == run_id]
+
+    def runs(self):
+        return list(dict.fromkeys(record["run_id"] for record in self._read()))
+
+
+_sink = None
+_sink_lock = threading.Lock()
+_run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def set_run_id(run_id):
+    """Attribute all following calls to `run_id`"""
+    global _run_id
+    _run_id = run_id
+
+
+def get_sink(config):
+    """Return the process-wide telemetry sink, or None when it is disabled"""
+    global _sink
+    settings = get_telemetry(config) if config else {}
+    if not settings.get("enabled", True):
+        return None
+    with _sink_lock:
+        if _sink is None:
+            path = settings.get("path", os.path.join("data", "telemetry.db"))
+            _sink = JsonlSink(path) if path.endswith(".jsonl") else SqliteSink(path)
+    return _sink
+
+
+def estimate_cost(config, model, prompt_tokens, completion_tokens, audio_tokens=0):
+    settings = get_telemetry(config) if config else {}
+    prices = settings.get("prices", DEFAULT_PRICES).get(model)
+    if prices is None:
+        return None
+    text_tokens = completion_tokens - audio_tokens
+    cost = prompt_tokens * prices.get("input", 0) + text_tokens * prices.get(
+        "output", 0
+    )
+    cost += audio_tokens * prices.get("audio_output", prices.get("output", 0))
+    return cost / 1_000_000
+
+
+def _usage_value(usage, name):
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get(name) or 0
+    return getattr(usage, name, 0) or 0
+
+
+def record_call(
+    config,
+    stage,
+    model,
+    latency,
+    usage=None,
+    audio_seconds=0.0,
+    retries=0,
+    cached=False,
+    error=None,
+):
+    """Store one API call: tokens, audio produced, latency, retries and cost"""
+    sink = get_sink(config)
+    if sink is None:
+        return
+    prompt_tokens = _usage_value(usage, "prompt_tokens")
+    completion_tokens = _usage_value(usage, "completion_tokens")
+    details = _usage_value(usage, "completion_tokens_details")
+    audio_tokens = _usage_value(details, "audio_tokens") if details else 0
+    cost = (
+        0.0
+        if cached
+        else estimate_cost(
+            config, model, prompt_tokens, completion_tokens, audio_tokens
+        )
+    )
+    try:
+        sink.write(
+            {
+                "run_id": _run_id,
+                "stage": stage,
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "audio_tokens": audio_tokens,
+                "audio_seconds": audio_seconds,
+                "latency_ms": latency * 1000,
+                "retries": retries,
+                "cached": int(cached),
+                "cost_usd": cost,
+                "error": error,
+                "created_at": time.time(),
+            }
+        )
+    except Exception as e:
+        # Telemetry must never break a pipeline run
+        print(f"Could not record telemetry: {e}")
+
+
+def report_run():
+    """Print the summary of the calls recorded for the current run"""
+    if _sink is not None:
+        print_summary(_run_id, _sink.records(_run_id))
+
+
+def summarize(records):
+    """Aggregate call records per stage"""
+    stages = defaultdict(lambda: defaultdict(float))
+    latencies = defaultdict(list)
+    for record in records:
+        stats = stages[record["stage"]]
+        stats["calls"] += 1
+        stats["cached"] += record["cached"]
+        stats["errors"] += 1 if record["error"] else 0
+        stats["retries"] += record["retries"]
+        stats["prompt_tokens"] += record["prompt_tokens"]
+        stats["completion_tokens"] += record["completion_tokens"]
+        stats["audio_seconds"] += record["audio_seconds"]
+        stats["cost_usd"] += record["cost_usd"] or 0
+        stats["latency_ms"] += record["latency_ms"]
+        if not record["cached"]:
+            latencies[record["stage"]].append(record["latency_ms"])
+    for stage, values in latencies.items():
+        values.sort()
+        stages[stage]["p95_ms"] = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return stages
+
+
+def print_summary(run_id, records):
+    stages = summarize(records)
+    print(f"\n=== Telemetry for run {run_id} ===")
+    if not stages:
+        print("No calls recorded")
+        return
+    print(
+        f"{'stage':<22}{'calls':>6}{'cached':>7}{'errors':>7}{'retries':>8}"
+        f"{'in tok':>9}{'out tok':>9}{'audio s':>9}{'time s':>8}{'p95 s':>7}"
+        f"{'cost $':>9}"
+    )
+    totals = defaultdict(float)
+    for stage, stats in stages.items():
+        print(
+            f"{stage:<22}{stats['calls']:>6.0f}{stats['cached']:>7.0f}"
+            f"{stats['errors']:>7.0f}{stats['retries']:>8.0f}"
+            f"{stats['prompt_tokens']:>9.0f}{stats['completion_tokens']:>9.0f}"
+            f"{stats['audio_seconds']:>9.1f}{stats['latency_ms'] / 1000:>8.1f}"
+            f"{stats['p95_ms'] / 1000:>7.1f}{stats['cost_usd']:>9.4f}"
+        )
+        for key, value in stats.items():
+            totals[key] += value
+    print(
+        f"{'total':<22}{totals['calls']:>6.0f}{totals['cached']:>7.0f}"
+        f"{totals['errors']:>7.0f}{totals['retries']:>8.0f}"
+        f"{totals['prompt_tokens']:>9.0f}{totals['completion_tokens']:>9.0f}"
+        f"{totals['audio_seconds']:>9.1f}{totals['latency_ms'] / 1000:>8.1f}"
+        f"{'':>7}{totals['cost_usd']:>9.4f}"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config_parser import load_config
+
+    parser = argparse.ArgumentParser(
+        description="Summarize token, latency and cost telemetry per run"
+    )
+    parser.add_argument("run_id", nargs="?", help="Run to summarize (default: last)")
+    parser.add_argument("--runs", action="store_true", help="List recorded runs")
+    args = parser.parse_args()
+
+    sink = get_sink(load_config())
+    if sink is None:
+        print("Telemetry is disabled")
+    elif args.runs:
+        for run_id in sink.runs():
+            print(run_id)
+    else:
+        runs = sink.runs()
+        run_id = args.run_id or (runs[-1] if runs else None)
+        if run_id is None:
+            print("No runs recorded")
+        else:
+            print_summary(run_id, sink.records(run_id))